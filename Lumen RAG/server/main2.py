@@ -1,7 +1,7 @@
 import os
 import pandas as pd
 from tempfile import NamedTemporaryFile
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
@@ -31,14 +31,22 @@ from tools.Tool_1_Financial_Report_Generator import generate_financial_report
 from tools.personalized_financial_advisor import (
     process_financial_document,
     get_financial_advice,
+    stream_financial_advice,
     update_user_preferences
 )
+from tools.advisor_runtime import get_advisor_runtime
+from tools.ingestion_jobs import get_ingestion_pool
+from models.circuit_breaker import circuit_metrics
+from models.llm_cache import get_llm_cache
+from models.embedding_cache import get_embedding_cache
+from models.llm import StreamInterruptedError
 
 # Import the market trend analyzer
 from tools.market_trend_analyzer import MarketTrendAnalyzer
 
 # Import the real-time queries
 from tools.real_time_queries import RealTimeQueries
+from models.http_pool import close_async_http_client
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -67,6 +75,18 @@ def initialize_app():
     loop.run_until_complete(rtq.initialize())
     loop.close()
 
+    # Connect the shared advisor clients and health-check them once
+    try:
+        get_advisor_runtime()
+    except Exception as e:
+        logger.error(f"Advisor runtime unavailable at startup: {str(e)}")
+
+    # Resume ingestion jobs left queued (or orphaned) by a previous run
+    try:
+        get_ingestion_pool()
+    except Exception as e:
+        logger.error(f"Ingestion workers unavailable at startup: {str(e)}")
+
 @app.teardown_appcontext
 def cleanup(exception=None):
     """Cleanup resources when the app context is torn down"""
@@ -99,8 +119,12 @@ def websocket_endpoint(ws):
                 # Process the query asynchronously
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
-                response = loop.run_until_complete(rtq.process_query(query))
-                loop.close()
+                try:
+                    response = loop.run_until_complete(rtq.process_query(query))
+                finally:
+                    # The pooled HTTP client is bound to this loop; close it with the loop
+                    loop.run_until_complete(close_async_http_client())
+                    loop.close()
                 
                 ws.send(json.dumps(response))
             except json.JSONDecodeError:
@@ -153,6 +177,24 @@ async def get_faq():
         logger.error(f"Error getting FAQ: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/ask', methods=['GET'])
+async def ask_question():
+    """Answer a question from the FAQ, or from the LLM without blocking the event loop"""
+    try:
+        question = request.args.get('question', '')
+        if not question:
+            return jsonify({"error": "Question is required"}), 400
+
+        try:
+            result = await rtq.answer_question(question)
+        finally:
+            # Flask runs each async view on its own event loop
+            await close_async_http_client()
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error answering question: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 # Market Trend Analyzer Routes
 @app.route('/analyze', methods=['POST'])
 async def analyze_investment():
@@ -384,12 +426,44 @@ def process_document_api():
         os.makedirs(os.path.dirname(document_path), exist_ok=True)
         file.save(document_path)
         
-        # Process document
-        result = process_financial_document(document_path, user_id)
-        return jsonify(result)
+        # Synchronous processing is still available for small files and scripts
+        if request.form.get('wait', '').lower() == 'true':
+            result = process_financial_document(document_path, user_id)
+            return jsonify(result)
+        
+        # Queue the document for background ingestion and return immediately
+        job_id = get_ingestion_pool().submit(user_id, document_path)
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/process-document/status/{job_id}"
+        }), 202
     except Exception as e:
         return jsonify({"error": f"Error processing document: {str(e)}"}), 500
 
+@app.route('/process-document/status/<job_id>', methods=['GET'])
+def process_document_status_api(job_id):
+    """Status of a background ingestion job, with per-stage progress and timings"""
+    try:
+        job = get_ingestion_pool().store.get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": f"Error fetching job status: {str(e)}"}), 500
+
+@app.route('/llm-metrics', methods=['GET'])
+def llm_metrics_api():
+    """Circuit breaker state per LLM provider, plus response and embedding cache hit rates"""
+    try:
+        return jsonify({
+            "circuits": circuit_metrics(),
+            "cache": get_llm_cache().stats() if os.getenv("LLM_CACHE", "1") == "1" else None,
+            "embedding_cache": get_embedding_cache().stats() if os.getenv("EMBEDDING_CACHE", "1") != "0" else None
+        })
+    except Exception as e:
+        return jsonify({"error": f"Error fetching LLM metrics: {str(e)}"}), 500
+
 @app.route('/get-advice', methods=['POST'])
 def get_advice_api():
     try:
@@ -411,6 +485,47 @@ def get_advice_api():
     except Exception as e:
         return jsonify({"error": f"Error getting advice: {str(e)}"}), 500
 
+@app.route('/get-advice/stream', methods=['POST'])
+def get_advice_stream_api():
+    """Stream the advice as server-sent events: one {"token": ...} event per chunk, then a "done" event
+
+    If the answer breaks off midway, an "error" event replaces "done".
+    """
+    data = request.get_json() or {}
+    query = data.get('query')
+    user_id = data.get('user_id')
+    document_path = data.get('document_path')
+    
+    if not query or not user_id:
+        return jsonify({"error": "Query and user_id are required"}), 400
+    
+    cancel_event = threading.Event()
+    
+    def generate():
+        tokens = stream_financial_advice(query, user_id, document_path, cancel_event=cancel_event)
+        try:
+            for token in tokens:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except StreamInterruptedError as e:
+            # Part of the answer was already sent; tell the client it is incomplete
+            logger.warning(f"Advice stream interrupted: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'The answer was interrupted before it finished. Please try again.', 'incomplete': True})}\n\n"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'error': f'Error getting advice: {str(e)}'})}\n\n"
+        finally:
+            # Runs when the client disconnects too: stop generating upstream
+            cancel_event.set()
+            tokens.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/update-preferences', methods=['POST'])
 def update_preferences_api():
     try:
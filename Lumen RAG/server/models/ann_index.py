@@ -0,0 +1,116 @@
+import os
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class IVFFlatIndex:
+    """Inverted-file (IVF-flat) index over rows of a normalised vector matrix.
+
+    Vectors are clustered with spherical k-means into `nlist` lists; a query
+    only scores the rows in its `nprobe` closest lists. More probes trade
+    latency for recall. The index stores row numbers only, the vectors stay
+    in the owning LocalVectorStore.
+    """
+
+    def __init__(self, nlist: int = None, nprobe: int = None, min_train_size: int = None, seed: int = 0):
+        self.nlist = nlist or int(os.getenv("IVF_NLIST", "256"))
+        self.nprobe = nprobe or int(os.getenv("IVF_NPROBE", "8"))
+        self.min_train_size = min_train_size or int(os.getenv("IVF_MIN_TRAIN_SIZE", str(self.nlist * 39)))
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._row_list: Dict[int, int] = {}
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self, size: int) -> bool:
+        """Train once there is enough data, and retrain after the data has grown 4x"""
+        if size < self.min_train_size:
+            return False
+        return not self.trained or size >= 4 * self.trained_size
+
+    def rebuild(self, vectors: np.ndarray, n_iter: int = 10, sample_size: int = None) -> None:
+        """Train centroids on (a sample of) vectors and assign every row"""
+        nlist = min(self.nlist, len(vectors))
+        rng = np.random.default_rng(self.seed)
+        sample_size = sample_size or nlist * 256
+        if len(vectors) > sample_size:
+            sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        else:
+            sample = np.asarray(vectors)
+
+        self.set_centroids(self._spherical_kmeans(sample, nlist, n_iter, rng))
+        self.assign(np.arange(len(vectors)), vectors)
+        self.trained_size = len(vectors)
+
+    def set_centroids(self, centroids: np.ndarray) -> None:
+        """Install centroids (trained or loaded from disk) and clear all lists"""
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self._lists = [[] for _ in range(len(self.centroids))]
+        self._list_arrays = {}
+        self._row_list = {}
+
+    def assign(self, rows: np.ndarray, vectors: np.ndarray, batch_size: int = 65536) -> None:
+        """Add rows to their nearest list, moving rows whose vectors were replaced"""
+        for start in range(0, len(rows), batch_size):
+            batch_rows = rows[start:start + batch_size]
+            nearest = np.argmax(np.asarray(vectors[start:start + batch_size]) @ self.centroids.T, axis=1)
+            for row, list_id in zip(batch_rows.tolist(), nearest.tolist()):
+                previous = self._row_list.get(row)
+                if previous == list_id:
+                    continue
+                if previous is not None:
+                    self._lists[previous].remove(row)
+                    self._list_arrays.pop(previous, None)
+                self._lists[list_id].append(row)
+                self._list_arrays.pop(list_id, None)
+                self._row_list[row] = list_id
+
+    def candidates(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None, nprobe: int = None) -> np.ndarray:
+        """Rows from the closest lists, probing further lists until at least k candidates pass `allowed`"""
+        order = np.argsort(-(self.centroids @ query))
+        nprobe = nprobe or self.nprobe
+
+        found = []
+        total = 0
+        for probed, list_id in enumerate(order):
+            rows = self._list_array(int(list_id))
+            if allowed is not None and len(rows):
+                rows = rows[np.isin(rows, allowed, assume_unique=True)]
+            if len(rows):
+                found.append(rows)
+                total += len(rows)
+            if probed + 1 >= nprobe and total >= k:
+                break
+
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    @staticmethod
+    def _spherical_kmeans(vectors: np.ndarray, k: int, n_iter: int, rng) -> np.ndarray:
+        centroids = vectors[rng.choice(len(vectors), k, replace=False)].astype(np.float32)
+        for _ in range(n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=k)
+            # Re-seed empty clusters with random points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+        return centroids
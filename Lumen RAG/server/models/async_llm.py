@@ -0,0 +1,325 @@
+import os
+import time
+import asyncio
+import weakref
+from models.circuit_breaker import CLOSED, get_circuit_breaker
+from models.http_pool import get_async_http_client
+from models.llm_cache import get_llm_cache
+from models.llm import (
+    BASE_URL,
+    OPENROUTER_MODEL,
+    OPENAI_FALLBACK_MODEL,
+    UNEXPECTED_FORMAT_MESSAGE,
+    API_ERROR_MESSAGE,
+    UNAVAILABLE_MESSAGE,
+    FAILURE_MESSAGES,
+    StreamInterruptedError,
+    parse_sse_line
+)
+
+# AsyncOpenAI clients per loop and key, each with the pooled httpx client it was built on
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def get_async_openai_client(api_key):
+    """Return the AsyncOpenAI client for this key on the running event loop.
+
+    It sends through the loop's pooled httpx client rather than opening its
+    own pool, so close_async_http_client releases its connections too.
+    """
+    http_client = get_async_http_client()
+    clients = _async_openai_clients.setdefault(asyncio.get_running_loop(), {})
+    entry = clients.get(api_key)
+    if entry is None or entry[0] is not http_client:
+        from openai import AsyncOpenAI
+        entry = (http_client, AsyncOpenAI(api_key=api_key, http_client=http_client))
+        clients[api_key] = entry
+    return entry[1]
+
+
+class AsyncOpenRouterLLM:
+    """Non-blocking counterpart of OpenRouterLLM for the FastAPI app and async Flask views.
+
+    Requests go through the running loop's pooled httpx client and back off
+    with asyncio.sleep, so a slow provider only suspends the awaiting task.
+    At most LLM_MAX_CONCURRENCY calls per event loop are in flight; the rest
+    wait their turn. Cancelling the awaiting task aborts the upstream request.
+    """
+
+    def __init__(self, api_key, temperature=0.1, max_concurrency=None):
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "HTTP-Referer": "http://localhost:8000",
+            "X-Title": "LangChain Integration",
+            "Content-Type": "application/json"
+        }
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.cache = get_llm_cache() if os.getenv("LLM_CACHE", "1") == "1" else None
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        # asyncio primitives belong to one loop, so each loop gets its own limit
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def __call__(self, prompt, image_url=None, use_cache=True, semantic_key=None, semantic_scope=None):
+        """Complete the prompt; same caching options as OpenRouterLLM.__call__"""
+        if hasattr(prompt, 'to_string'):
+            prompt = prompt.to_string()
+
+        cache = self.cache if use_cache and not image_url else None
+        if cache:
+            # The cache is SQLite-backed (and may embed the key), so keep it off the loop
+            cached = await asyncio.to_thread(cache.get, str(prompt), OPENROUTER_MODEL, self.temperature, semantic_key, semantic_scope)
+            if cached is not None:
+                print("Serving LLM response from cache")
+                return cached
+
+        async with self._semaphore():
+            content, model = await self._generate(prompt, image_url)
+
+        # Entries are looked up under OPENROUTER_MODEL, so fallback answers are not cached
+        if cache and model == OPENROUTER_MODEL and content and content not in FAILURE_MESSAGES:
+            await asyncio.to_thread(cache.put, str(prompt), OPENROUTER_MODEL, self.temperature, content, semantic_key, semantic_scope)
+        return content
+
+    def _payload(self, prompt, image_url=None, stream=False):
+        message_content = [{"type": "text", "text": str(prompt)}]
+        if image_url:
+            message_content.append({"type": "image_url", "image_url": {"url": image_url}})
+        return {
+            "model": OPENROUTER_MODEL,
+            "messages": [{"role": "user", "content": message_content}],
+            "temperature": self.temperature,
+            "max_tokens": 1000,
+            "stream": stream
+        }
+
+    async def _generate(self, prompt, image_url=None):
+        """Return (content, model that answered); model is None for the failure messages"""
+        import httpx
+
+        client = get_async_http_client()
+        payload = self._payload(prompt, image_url)
+        max_attempts = 3
+        backoff_base = 1.5
+        # Same breakers as the sync client, so both servers route around an outage
+        openrouter = get_circuit_breaker("openrouter")
+
+        for attempt in range(1, max_attempts + 1):
+            if not openrouter.allow():
+                print("OpenRouter circuit open - routing to secondary provider")
+                break
+            started = time.monotonic()
+            try:
+                print(f"Sending async request to OpenRouter API (attempt {attempt})...")
+                response = await client.post(f"{BASE_URL}/chat/completions", headers=self.headers, json=payload)
+                print(f"OpenRouter API Response Status: {response.status_code}")
+
+                if response.status_code == 200:
+                    openrouter.record_success(time.monotonic() - started)
+                    response_json = response.json()
+                    if not response_json.get("choices"):
+                        print(f"Unexpected API response format: {response_json}")
+                        return UNEXPECTED_FORMAT_MESSAGE, None
+                    return response_json["choices"][0]["message"]["content"], OPENROUTER_MODEL
+
+                if 500 <= response.status_code < 600:
+                    openrouter.record_failure()
+                    print(f"OpenRouter transient error {response.status_code}: {response.text}")
+                    if attempt < max_attempts and openrouter.state == CLOSED:
+                        await asyncio.sleep(backoff_base ** attempt)
+                        continue
+                    print("Max retries reached for OpenRouter.")
+                    break
+
+                if response.status_code == 429:
+                    openrouter.record_failure()
+                    print(f"OpenRouter rate-limited (429): {response.text} - falling back to secondary provider")
+                    break
+                openrouter.record_success(time.monotonic() - started)
+                print(f"OpenRouter API Error: {response.status_code} - {response.text}")
+                return API_ERROR_MESSAGE, None
+
+            except httpx.HTTPError as e:
+                openrouter.record_failure()
+                print(f"Network or timeout error calling OpenRouter: {e}")
+                if attempt < max_attempts and openrouter.state == CLOSED:
+                    await asyncio.sleep(backoff_base ** attempt)
+                    continue
+                print("Max retries reached due to network errors.")
+                break
+
+        openai_key = os.getenv("OPENAI_API_KEY")
+        fallback = get_circuit_breaker("openai")
+        if openai_key and fallback.allow():
+            started = time.monotonic()
+            try:
+                client = get_async_openai_client(openai_key)
+                print("Calling OpenAI (async SDK) as fallback provider...")
+                resp = await client.chat.completions.create(
+                    model=OPENAI_FALLBACK_MODEL,
+                    messages=[{"role": "user", "content": str(prompt)}],
+                    temperature=self.temperature,
+                    max_tokens=800
+                )
+                fallback.record_success(time.monotonic() - started)
+                return resp.choices[0].message.content, OPENAI_FALLBACK_MODEL
+            except Exception as e:
+                fallback.record_failure()
+                print(f"OpenAI fallback failed: {e}")
+        elif openai_key:
+            print("OpenAI circuit open - no healthy provider")
+
+        return UNAVAILABLE_MESSAGE, None
+
+    async def stream(self, prompt, image_url=None, use_cache=True, semantic_key=None, semantic_scope=None):
+        """Async generator of answer tokens; a cached answer is yielded as a single chunk.
+
+        Retries and falls back only until the first token is out; a failure
+        after that raises StreamInterruptedError, and only answers OpenRouter
+        streamed to completion are cached. Closing the generator (or
+        cancelling its consumer) releases the upstream connection.
+        """
+        if hasattr(prompt, 'to_string'):
+            prompt = prompt.to_string()
+
+        cache = self.cache if use_cache and not image_url else None
+        if cache:
+            cached = await asyncio.to_thread(cache.get, str(prompt), OPENROUTER_MODEL, self.temperature, semantic_key, semantic_scope)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        outcome = {}
+        async with self._semaphore():
+            tokens = self._stream(prompt, image_url, outcome)
+            try:
+                async for token in tokens:
+                    parts.append(token)
+                    yield token
+            finally:
+                await tokens.aclose()
+
+        content = "".join(parts)
+        if cache and outcome.get("model") == OPENROUTER_MODEL and content and content not in FAILURE_MESSAGES:
+            await asyncio.to_thread(cache.put, str(prompt), OPENROUTER_MODEL, self.temperature, content, semantic_key, semantic_scope)
+
+    async def _stream(self, prompt, image_url=None, outcome=None):
+        """Token generator behind stream(); outcome["model"] names the model once the answer completes"""
+        import httpx
+
+        if outcome is None:
+            outcome = {}
+
+        client = get_async_http_client()
+        payload = self._payload(prompt, image_url, stream=True)
+        max_attempts = 3
+        backoff_base = 1.5
+
+        openrouter = get_circuit_breaker("openrouter")
+
+        for attempt in range(1, max_attempts + 1):
+            if not openrouter.allow():
+                print("OpenRouter circuit open - routing to secondary provider")
+                break
+            started = time.monotonic()
+            started_streaming = False
+            retry = False
+            try:
+                print(f"Sending async streaming request to OpenRouter API (attempt {attempt})...")
+                async with client.stream("POST", f"{BASE_URL}/chat/completions", headers=self.headers, json=payload) as response:
+                    if response.status_code == 200:
+                        async for line in response.aiter_lines():
+                            done, content, error = parse_sse_line(line)
+                            if error:
+                                # An HTTPError, so it takes the same retry/fallback/breaker path as a dropped connection
+                                raise httpx.RemoteProtocolError(f"Stream error: {error}")
+                            if content:
+                                if not started_streaming:
+                                    # Latency to the first token is what the breaker judges streams by
+                                    openrouter.record_success(time.monotonic() - started)
+                                    started_streaming = True
+                                yield content
+                            if done:
+                                break
+                        else:
+                            # The body ended without "[DONE]" or a finish_reason: the answer was cut off
+                            raise httpx.RemoteProtocolError("Stream ended before the answer was complete")
+                        if not started_streaming:
+                            openrouter.record_success(time.monotonic() - started)
+                        outcome["model"] = OPENROUTER_MODEL
+                        return
+
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    if response.status_code == 429 or 500 <= response.status_code < 600:
+                        openrouter.record_failure()
+                    if 500 <= response.status_code < 600 and attempt < max_attempts and openrouter.state == CLOSED:
+                        print(f"OpenRouter transient error {response.status_code}: {body}")
+                        retry = True
+                    elif response.status_code == 429 or 500 <= response.status_code < 600:
+                        print(f"OpenRouter unavailable ({response.status_code}) - falling back to secondary provider")
+                    else:
+                        openrouter.record_success(time.monotonic() - started)
+                        print(f"OpenRouter API Error: {response.status_code} - {body}")
+                        yield API_ERROR_MESSAGE
+                        return
+
+            except httpx.HTTPError as e:
+                print(f"Network or timeout error streaming from OpenRouter: {e}")
+                openrouter.record_failure()
+                if started_streaming:
+                    # Part of the answer is already out; don't restart it from another provider
+                    raise StreamInterruptedError(str(e)) from e
+                retry = attempt < max_attempts and openrouter.state == CLOSED
+
+            if not retry:
+                break
+            # Sleep outside the response context so the connection goes back to the pool first
+            await asyncio.sleep(backoff_base ** attempt)
+
+        openai_key = os.getenv("OPENAI_API_KEY")
+        fallback = get_circuit_breaker("openai")
+        if openai_key and fallback.allow():
+            started = time.monotonic()
+            sent = False
+            try:
+                client = get_async_openai_client(openai_key)
+                print("Streaming from OpenAI as fallback provider...")
+                stream = await client.chat.completions.create(
+                    model=OPENAI_FALLBACK_MODEL,
+                    messages=[{"role": "user", "content": str(prompt)}],
+                    temperature=self.temperature,
+                    max_tokens=800,
+                    stream=True
+                )
+                finished = False
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not sent:
+                            fallback.record_success(time.monotonic() - started)
+                            sent = True
+                        yield chunk.choices[0].delta.content
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finished = True
+                if not finished:
+                    raise StreamInterruptedError("OpenAI stream ended before the answer was complete")
+                if not sent:
+                    fallback.record_success(time.monotonic() - started)
+                outcome["model"] = OPENAI_FALLBACK_MODEL
+                return
+            except Exception as e:
+                print(f"OpenAI streaming fallback failed: {e}")
+                fallback.record_failure()
+                if sent:
+                    raise StreamInterruptedError(str(e)) from e
+        elif openai_key:
+            print("OpenAI circuit open - no healthy provider")
+
+        yield UNAVAILABLE_MESSAGE
@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from typing import List, Dict, Any
+
+DEFAULT_BM25_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "bm25")
+)
+
+# Filing forms such as "10-K" and "20-F" (tried before plain numbers so they stay whole),
+# numbers (with $, commas, decimals, %) and words/tickers such as "AAPL", "S&P", "year-over-year"
+TOKEN_PATTERN = re.compile(r"\d+-[A-Za-z][A-Za-z0-9]*|\$?\d[\d,]*(?:\.\d+)?%?|[A-Za-z][A-Za-z0-9&]*(?:-[A-Za-z0-9&]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "what",
+    "which", "who", "how", "i", "my", "me", "should", "do", "does", "can"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms that keep tickers, line-item words and figures intact ("$1,234.5" -> "1234.5")"""
+    tokens = []
+    for raw in TOKEN_PATTERN.findall(text):
+        token = raw.lower()
+        if token[0] == "$" or token[0].isdigit():
+            token = token.lstrip("$").replace(",", "")
+        if token and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of one user's chunks"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_metadata: List[Dict[str, Any]] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._row_by_id: Dict[str, int] = {}
+
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        if doc_id in self._row_by_id:
+            self._remove(self._row_by_id[doc_id])
+            row = self._row_by_id[doc_id]
+            self.doc_metadata[row] = metadata
+        else:
+            row = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_metadata.append(metadata)
+            self.doc_lengths.append(0)
+            self._row_by_id[doc_id] = row
+
+        counts = Counter(tokenize(text))
+        self.doc_lengths[row] = sum(counts.values())
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[row] = tf
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        n_docs = len(self.doc_ids)
+        if n_docs == 0:
+            return []
+        avg_length = (sum(self.doc_lengths) / n_docs) or 1.0
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for row, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {"id": self.doc_ids[row], "score": score, "metadata": self.doc_metadata[row]}
+            for row, score in ranked
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doc_ids": self.doc_ids,
+            "doc_metadata": self.doc_metadata,
+            "doc_lengths": self.doc_lengths,
+            "postings": {term: {str(row): tf for row, tf in posting.items()} for term, posting in self.postings.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        index = cls()
+        index.doc_ids = data["doc_ids"]
+        index.doc_metadata = data["doc_metadata"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: {int(row): tf for row, tf in posting.items()} for term, posting in data["postings"].items()}
+        index._row_by_id = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        return index
+
+    def _remove(self, row: int) -> None:
+        for term in list(self.postings):
+            posting = self.postings[term]
+            if row in posting:
+                del posting[row]
+                if not posting:
+                    del self.postings[term]
+
+
+class BM25Store:
+    """Per-user BM25 indexes, cached in memory and persisted as JSON under data/bm25.
+
+    Each user's index has its own lock, so saving one user's index never
+    holds up searches on another's.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("BM25_INDEX_PATH", DEFAULT_BM25_DIR)
+        self._indexes: Dict[str, BM25Index] = {}
+        self._user_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def add_documents(self, user_id: str, records: List[Dict[str, Any]]) -> int:
+        """Index records of the form {"id", "metadata": {"text", ...}} for one user"""
+        with self._lock_for(user_id):
+            index = self._get_index(user_id)
+            for record in records:
+                index.add(record["id"], record["metadata"]["text"], record["metadata"])
+            self._save(user_id, index)
+        return len(records)
+
+    def search(self, user_id: str, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        with self._lock_for(user_id):
+            index = self._get_index(user_id)
+            return index.search(query, top_k)
+
+    def _lock_for(self, user_id: str) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._user_locks[user_id] = lock
+            return lock
+
+    def _index_path(self, user_id: str) -> str:
+        safe_user = re.sub(r"[^A-Za-z0-9_\-]", "_", user_id)
+        return os.path.join(self.path, f"{safe_user}.json")
+
+    def _get_index(self, user_id: str) -> BM25Index:
+        index = self._indexes.get(user_id)
+        if index is None:
+            index_path = self._index_path(user_id)
+            if os.path.exists(index_path):
+                with open(index_path, "r") as f:
+                    index = BM25Index.from_dict(json.load(f))
+            else:
+                index = BM25Index()
+            self._indexes[user_id] = index
+        return index
+
+    def _save(self, user_id: str, index: BM25Index) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        index_path = self._index_path(user_id)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, index_path)
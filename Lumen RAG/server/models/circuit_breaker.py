@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker over a rolling window of calls.
+
+    The circuit opens when, over the last window_seconds and at least
+    min_calls calls, the share of failures or of slow calls reaches
+    error_rate. While open, allow() is False so callers route straight to
+    another provider. After open_seconds one probe call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = None,
+        min_calls: int = None,
+        window_seconds: float = None,
+        slow_call_seconds: float = None,
+        open_seconds: float = None
+    ):
+        self.name = name
+        self.error_rate = error_rate or float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+        self.min_calls = min_calls or int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+        self.window_seconds = window_seconds or float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+        self.slow_call_seconds = slow_call_seconds or float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "15"))
+        self.open_seconds = open_seconds or float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._total_latency = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go to this provider now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe whose outcome was never recorded expires
+                if self._probe_started is None or now - self._probe_started >= self.open_seconds:
+                    self._probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._total_latency += latency
+            if self.state == HALF_OPEN:
+                if latency < self.slow_call_seconds:
+                    self._close()
+                else:
+                    self._open(time.monotonic())
+                return
+            self._record(True, latency)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            if self.state == HALF_OPEN:
+                self._open(time.monotonic())
+                return
+            self._record(False, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            window_failures = sum(1 for _, ok, _ in self._calls if not ok)
+            return dict(
+                self._stats,
+                name=self.name,
+                state=self.state,
+                window_calls=len(self._calls),
+                window_error_rate=round(window_failures / len(self._calls), 4) if self._calls else 0.0,
+                avg_latency_seconds=round(self._total_latency / self._stats["successes"], 3) if self._stats["successes"] else 0.0,
+                retry_in_seconds=round(max(0.0, self._opened_at + self.open_seconds - now), 1) if self.state == OPEN else 0.0
+            )
+
+    def _record(self, ok: bool, latency: Optional[float]) -> None:
+        now = time.monotonic()
+        self._calls.append((now, ok, latency))
+        self._trim(now)
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, ok, latency in self._calls if ok and latency >= self.slow_call_seconds)
+        if failures / len(self._calls) >= self.error_rate or slow / len(self._calls) >= self.error_rate:
+            self._open(now)
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        print(f"Circuit for {self.name} opened; routing around it for {self.open_seconds:.0f}s")
+        self.state = OPEN
+        self._opened_at = now
+        self._probe_started = None
+        self._stats["opened"] += 1
+
+    def _close(self) -> None:
+        print(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+        self._calls.clear()
+        self._probe_started = None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for a provider, shared by sync and async clients"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name)
+                _breakers[name] = breaker
+    return breaker
+
+
+def circuit_metrics() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+import hashlib
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "cache", "embeddings.sqlite3")
+)
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: an in-memory LRU in front of a SQLite store.
+
+    Entries are keyed by sha256(model name + text), so the same chunk or query
+    is only ever sent to the embedding API once per model. The LRU holds
+    tuples and lookups return fresh lists, so callers may modify what they get.
+    """
+
+    def __init__(self, path: str = None, memory_size: int = None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.memory_size = memory_size or int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+        self._memory: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up each text; returns None in the positions that are not cached"""
+        keys = [self.make_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        with self._lock:
+            disk_lookup: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = list(vector)
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup:
+                found = self._read_from_disk(list(disk_lookup))
+                for key, positions in disk_lookup.items():
+                    vector = found.get(key)
+                    if vector is None:
+                        self.misses += len(positions)
+                        continue
+                    self._remember(key, vector)
+                    for i in positions:
+                        results[i] = list(vector)
+                    self.disk_hits += len(positions)
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store freshly computed embeddings in both tiers"""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model, text)
+                vector = tuple(vector)
+                self._remember(key, vector)
+                rows.append((key, model, len(vector), array("f", vector).tobytes()))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since process start"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def _read_from_disk(self, keys: List[str]) -> Dict[str, Tuple[float, ...]]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" for _ in batch)
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = tuple(vector)
+        return found
+
+    def _remember(self, key: str, vector: Tuple[float, ...]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: str = None) -> EmbeddingCache:
+    """Return the process-wide cache for a store path so every EmbeddingModel shares it"""
+    path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path=path)
+        return _caches[path]
@@ -0,0 +1,108 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under the provider's request rate"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Recognise 429 / quota errors from the Google and LangChain clients"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "resource_exhausted" in message or "resource exhausted" in message or "rate limit" in message
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> TokenBucket:
+    """Process-wide limiter, since the provider quota is per API key rather than per client"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            requests_per_minute = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1500"))
+            burst = float(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+            _default_limiter = TokenBucket(requests_per_minute / 60.0, burst)
+        return _default_limiter
+
+
+class EmbeddingExecutor:
+    """Splits texts into provider-sized batches and embeds them concurrently.
+
+    Every request first takes a token from the rate limiter, 429s are retried
+    with exponential backoff, and the output order always matches the input.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        batch_size: int = None,
+        max_workers: int = None,
+        rate_limiter: TokenBucket = None,
+        max_retries: int = 5,
+        backoff_base: float = 1.0
+    ):
+        self.embed_fn = embed_fn
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        self.max_workers = max_workers or int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+
+    def run(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, preserving input order"""
+        if not texts:
+            return []
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            results = [self._embed_batch(batches[0])]
+        else:
+            # map() yields results in submission order
+            results = list(self._pool.map(self._embed_batch, batches))
+
+        embeddings = [embedding for batch in results for embedding in batch]
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        return embeddings
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return self.embed_fn(batch)
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                sleep_for = self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+                print(f"Embedding request rate-limited, retrying in {sleep_for:.1f}s (attempt {attempt + 1})...")
+                time.sleep(sleep_for)
@@ -2,24 +2,47 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from pydantic import SecretStr
+from models.embedding_cache import get_embedding_cache
+from models.embedding_executor import EmbeddingExecutor
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+EMBEDDING_MODEL_NAME = "models/text-embedding-004"
 
 class EmbeddingModel:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None):
         self.api_key = api_key or GOOGLE_API_KEY
+        self.model_name = EMBEDDING_MODEL_NAME
         self.model = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004",
+            model=self.model_name,
             google_api_key=SecretStr(self.api_key) if self.api_key else None
         )
-        
-    
+        # Batches, concurrency and rate limiting for the provider calls
+        self.executor = EmbeddingExecutor(self.model.embed_documents)
+        # Set EMBEDDING_CACHE=0 to always call the API
+        if cache is None and os.getenv("EMBEDDING_CACHE", "1") != "0":
+            cache = get_embedding_cache()
+        self.cache = cache
+
+
     def get_embeddings(self, texts):
-        """Generate embeddings for the provided texts."""
+        """Generate embeddings for the provided texts, reusing cached ones where possible."""
         if isinstance(texts, str):
             texts = [texts]
-        return self.model.embed_documents(texts)
\ No newline at end of file
+        if self.cache is None:
+            return self.executor.run(texts)
+
+        embeddings = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Embed each distinct uncached text once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = self.executor.run(unique_texts)
+            self.cache.put_many(self.model_name, unique_texts, fresh)
+            by_text = dict(zip(unique_texts, fresh))
+            for i in missing:
+                embeddings[i] = list(by_text[texts[i]])
+        return embeddings
@@ -0,0 +1,114 @@
+import re
+from typing import List, Dict, Any
+from models.graph_writer import ENTITY_TEXT_INDEX
+
+# All terms in one Lucene query, already scoped to the user so the candidate limit
+# applies to their entities only; facts touching several matched entities score higher.
+# The exact user_id check guards against analyzer tokenisation of the id.
+FACT_SEARCH_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $search) YIELD node, score
+WHERE node.user_id = $user_id
+WITH node, score LIMIT $candidate_limit
+MATCH (node)-[r:RELATES]-(:Entity)
+WITH startNode(r) AS e1, r, endNode(r) AS e2, score
+RETURN e1.text AS entity1, r.type AS relationship, e2.text AS entity2,
+    collect(r.value)[0] AS value, collect(r.context)[0] AS context, sum(score) AS score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+# Used only when the full-text index is unavailable: still one round trip for all terms
+FACT_SCAN_QUERY = """
+MATCH (e1:Entity)-[r:RELATES]->(e2:Entity)
+WHERE e1.user_id = $user_id
+AND ANY(term IN $terms WHERE toLower(e1.text) CONTAINS term OR toLower(e2.text) CONTAINS term)
+WITH e1.text AS entity1, r.type AS relationship, e2.text AS entity2,
+    collect(r.value)[0] AS value, collect(r.context)[0] AS context,
+    size([term IN $terms WHERE toLower(e1.text) CONTAINS term OR toLower(e2.text) CONTAINS term]) AS score
+RETURN entity1, relationship, entity2, value, context, score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+# Where the standard analyzer breaks words: anything but word characters, and '.', ',' or "'"
+# only between characters ("3.5", "1,234" and "don't" stay whole, "10-K" and "S&P" split)
+ANALYZER_BREAK = re.compile(r"[^\w.,']+")
+
+
+def analyzer_tokens(term: str) -> List[str]:
+    """Approximate the tokens Neo4j's standard analyzer indexes for term"""
+    tokens = (token.strip(".,'") for token in ANALYZER_BREAK.split(term))
+    return [token for token in tokens if token]
+
+
+def build_fulltext_query(terms: List[str], user_id: str = None) -> str:
+    """OR together the terms: phrases are quoted, single words also match as a prefix ("stock" -> "stocks").
+
+    Terms the analyzer splits ("10-k" -> 10, k) become phrases too, since a
+    prefix query is not analyzed and "10-k*" would match no indexed token.
+    With user_id, the terms must match the entity text and the entity must belong to that user.
+    Returns "" when no term leaves any token to search for.
+    """
+    clauses = []
+    for term in terms:
+        tokens = analyzer_tokens(term)
+        if not tokens:
+            continue
+        escaped = LUCENE_SPECIAL.sub(r"\\\1", " ".join(tokens))
+        if len(tokens) > 1:
+            clauses.append(f'"{escaped}"')
+        else:
+            clauses.append(f"{escaped}*")
+    if not clauses:
+        return ""
+    query = " OR ".join(clauses)
+    if user_id is None:
+        return query
+    escaped_user = LUCENE_SPECIAL.sub(r"\\\1", user_id)
+    return f'user_id:"{escaped_user}" AND text:({query})'
+
+
+class GraphFactSearch:
+    """Ranked knowledge-graph fact lookup for a set of search terms in a single Cypher query"""
+
+    def __init__(self, driver, index_name: str = ENTITY_TEXT_INDEX, candidate_factor: int = 4):
+        self.driver = driver
+        self.index_name = index_name
+        self.candidate_factor = candidate_factor
+
+    def search(self, user_id: str, terms: List[str], limit: int = 50) -> List[Dict[str, Any]]:
+        terms = [term.strip().lower() for term in terms if term.strip()]
+        search = build_fulltext_query(terms, user_id)
+        if not terms or not search:
+            return []
+
+        with self.driver.session() as session:
+            try:
+                records = session.run(
+                    FACT_SEARCH_QUERY,
+                    index=self.index_name,
+                    search=search,
+                    user_id=user_id,
+                    candidate_limit=limit * self.candidate_factor,
+                    limit=limit
+                )
+                return [self._to_fact(record) for record in records]
+            except Exception as e:
+                print(f"Full-text fact search failed, falling back to a scan: {str(e)}")
+
+            records = session.run(FACT_SCAN_QUERY, terms=terms, user_id=user_id, limit=limit)
+            return [self._to_fact(record) for record in records]
+
+    @staticmethod
+    def _to_fact(record) -> Dict[str, Any]:
+        return {
+            "entity1": record["entity1"],
+            "relationship": record["relationship"],
+            "entity2": record["entity2"],
+            "value": record["value"],
+            "context": record["context"],
+            "score": record["score"]
+        }
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from typing import List, Dict, Any
+
+# Full-text index behind graph fact lookups (see models/graph_search.py). It covers
+# user_id as well as text so the Lucene query itself is scoped to one user.
+ENTITY_TEXT_INDEX = "entity_text_by_user"
+# Text-only predecessor of ENTITY_TEXT_INDEX; dropped when the schema is ensured
+LEGACY_ENTITY_TEXT_INDEX = "entity_text"
+
+ENTITY_BATCH_QUERY = """
+UNWIND $rows AS row
+MERGE (e:Entity {id: row.id})
+SET e.text = row.text,
+    e.type = row.type,
+    e.chunk_index = row.chunk_index,
+    e.user_id = $user_id,
+    e.graph_id = $graph_id
+"""
+
+# Schema DDL runs once per process (at the runtime health check, or before the first write)
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Clears an earlier write of the same graph (e.g. an interrupted ingestion attempt)
+DELETE_GRAPH_QUERY = """
+MATCH (e:Entity {graph_id: $graph_id})
+DETACH DELETE e
+"""
+
+RELATIONSHIP_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (source:Entity {id: row.source})
+MATCH (target:Entity {id: row.target})
+CREATE (source)-[r:RELATES {
+    type: row.type,
+    context: row.context,
+    value: row.value,
+    weight: row.weight,
+    chunk_refs: row.chunk_refs,
+    user_id: $user_id,
+    graph_id: $graph_id
+}]->(target)
+"""
+
+
+class Neo4jBulkWriter:
+    """Writes knowledge-graph entities and relationships to Neo4j in UNWIND batches.
+
+    Each batch is one parameterised query inside an explicit write transaction,
+    so a document costs a handful of round trips instead of one per row.
+    """
+
+    def __init__(self, driver, batch_size: int = None):
+        self.driver = driver
+        self.batch_size = batch_size or int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "1000"))
+
+    def ensure_schema(self) -> None:
+        """Create the id constraint that backs MERGE/MATCH and the indexes used by fact lookups.
+
+        Idempotent but not free (several DDL round trips), so it runs once per process.
+        """
+        global _schema_ready
+        if _schema_ready:
+            return
+        with _schema_lock:
+            if _schema_ready:
+                return
+            self._create_schema()
+            _schema_ready = True
+
+    def _create_schema(self) -> None:
+        with self.driver.session() as session:
+            session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE").consume()
+            # Serves the scan fallback in graph_search, which filters on user_id before matching text
+            session.run("CREATE INDEX entity_user_id IF NOT EXISTS FOR (e:Entity) ON (e.user_id)").consume()
+            # Lets a rewrite find the previous copy of a graph
+            session.run("CREATE INDEX entity_graph_id IF NOT EXISTS FOR (e:Entity) ON (e.graph_id)").consume()
+            session.run(f"DROP INDEX {LEGACY_ENTITY_TEXT_INDEX} IF EXISTS").consume()
+            session.run(
+                f"CREATE FULLTEXT INDEX {ENTITY_TEXT_INDEX} IF NOT EXISTS FOR (e:Entity) ON EACH [e.text, e.user_id]"
+            ).consume()
+
+    def write_graph(self, entities: List[Dict], relationships: List[Dict], user_id: str, graph_id: str) -> Dict[str, Any]:
+        """Write one document's graph and return throughput stats.
+
+        Entity ids are scoped by graph_id so ids from different documents never collide.
+        Writing a graph_id that already exists replaces that graph rather than adding to it.
+        """
+        # No-op once the health check (or an earlier write) has created the schema
+        self.ensure_schema()
+
+        entity_rows = [
+            {
+                "id": f"{graph_id}:{entity['id']}",
+                "text": entity["text"],
+                "type": entity["type"],
+                "chunk_index": entity.get("chunk_index", -1)
+            }
+            for entity in entities
+        ]
+        relationship_rows = [
+            {
+                "source": f"{graph_id}:{rel['source']}",
+                "target": f"{graph_id}:{rel['target']}",
+                "type": rel["type"],
+                "context": rel.get("context", ""),
+                "value": rel.get("value", ""),
+                "weight": rel.get("weight", 1),
+                "chunk_refs": rel.get("chunk_refs", [])
+            }
+            for rel in relationships
+        ]
+
+        started = time.perf_counter()
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(DELETE_GRAPH_QUERY, graph_id=graph_id).consume())
+            entity_batches = self._write_batches(session, ENTITY_BATCH_QUERY, entity_rows, user_id, graph_id)
+            relationship_batches = self._write_batches(session, RELATIONSHIP_BATCH_QUERY, relationship_rows, user_id, graph_id)
+        elapsed = time.perf_counter() - started
+
+        total_rows = len(entity_rows) + len(relationship_rows)
+        stats = {
+            "entities_written": len(entity_rows),
+            "relationships_written": len(relationship_rows),
+            "batches": entity_batches + relationship_batches,
+            "batch_size": self.batch_size,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else float(total_rows)
+        }
+        print(
+            f"Wrote {stats['entities_written']} entities and {stats['relationships_written']} relationships "
+            f"in {stats['batches']} batches ({stats['seconds']}s, {stats['rows_per_second']} rows/s)"
+        )
+        return stats
+
+    def _write_batches(self, session, query: str, rows: List[Dict], user_id: str, graph_id: str) -> int:
+        """Send rows in batch_size slices, one write transaction per slice"""
+        batches = 0
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            session.execute_write(self._run_batch, query, batch, user_id, graph_id)
+            batches += 1
+        return batches
+
+    @staticmethod
+    def _run_batch(tx, query: str, rows: List[Dict], user_id: str, graph_id: str) -> None:
+        tx.run(query, rows=rows, user_id=user_id, graph_id=graph_id).consume()
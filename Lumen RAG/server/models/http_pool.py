@@ -0,0 +1,87 @@
+import os
+import asyncio
+import threading
+import weakref
+from typing import Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# httpx.AsyncClient is bound to the event loop it was first used on, so keep one per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def get_http_timeout() -> Tuple[float, float]:
+    """(connect, read) timeouts from HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT"""
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    )
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide keep-alive session.
+
+    Connections to each host are pooled (HTTP_POOL_CONNECTIONS hosts,
+    HTTP_POOL_MAXSIZE connections per host), so repeated LLM calls reuse an
+    open TCP+TLS connection instead of handshaking every time. Retries are
+    left to the callers, which already back off on their own.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "20")),
+                    max_retries=0
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_async_http_client():
+    """Return the pooled httpx.AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        # Imported here so sync-only processes don't need httpx
+        import httpx
+        with _async_clients_lock:
+            client = _async_clients.get(loop)
+            if client is None or client.is_closed:
+                connect_timeout, read_timeout = get_http_timeout()
+                client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv("HTTP_POOL_MAXSIZE", "20")),
+                        max_keepalive_connections=int(os.getenv("HTTP_POOL_MAXSIZE", "20")),
+                        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+                    )
+                )
+                _async_clients[loop] = client
+    return client
+
+
+async def close_async_http_client() -> None:
+    """Close the running loop's client; call from the loop's cleanup hook"""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def close_http_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
@@ -2,6 +2,11 @@ import os
 from dotenv import load_dotenv
 import requests
 import time
+import json
+import threading
+from models.http_pool import get_http_session, get_http_timeout
+from models.llm_cache import get_llm_cache
+from models.circuit_breaker import CLOSED, get_circuit_breaker
 
 
 # Load environment variables
@@ -10,6 +15,60 @@ load_dotenv()
 # Configuration
 OPENROUTER_GEMMA_API_KEY = os.getenv("OPENROUTER_GEMMA_API_KEY")
 BASE_URL="https://openrouter.ai/api/v1"
+OPENROUTER_MODEL = "mistralai/mistral-small-3.2-24b-instruct:free"
+OPENAI_FALLBACK_MODEL = "gpt-4o-mini"
+
+UNEXPECTED_FORMAT_MESSAGE = "Sorry, received an unexpected response format."
+API_ERROR_MESSAGE = "Sorry, there was an error with the API request."
+UNAVAILABLE_MESSAGE = "Sorry, the language model is temporarily unavailable — please try again in a few minutes."
+# Never cached: a retry should get a real answer
+FAILURE_MESSAGES = {UNEXPECTED_FORMAT_MESSAGE, API_ERROR_MESSAGE, UNAVAILABLE_MESSAGE}
+
+
+class StreamInterruptedError(Exception):
+    """The provider failed after part of the answer had already been streamed"""
+
+
+def parse_sse_line(line):
+    """Parse one OpenAI-style SSE line into (done, content, error).
+
+    done is set at "[DONE]" and on the chunk carrying a finish_reason, whose
+    content (if any) still belongs to the answer.
+    """
+    # Blank lines separate events; lines starting with ":" are keep-alive comments
+    if not line or not line.startswith("data:"):
+        return False, None, None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return True, None, None
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return False, None, None
+    if event.get("error"):
+        return False, None, event["error"]
+    choices = event.get("choices") or []
+    if not choices:
+        return False, None, None
+    choice = choices[0]
+    return bool(choice.get("finish_reason")), (choice.get("delta") or {}).get("content"), None
+
+
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key):
+    """Return a cached OpenAI client per key; the client keeps its own connection pool"""
+    client = _openai_clients.get(api_key)
+    if client is None:
+        with _openai_clients_lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=api_key)
+                _openai_clients[api_key] = client
+    return client
 
 class OpenRouterLLM:
     def __init__(self, api_key, temperature=0.1):
@@ -20,12 +79,39 @@ class OpenRouterLLM:
             "Content-Type": "application/json"
         }
         self.temperature = temperature
+        # Shared keep-alive session: no new TCP+TLS handshake per call
+        self.session = get_http_session()
+        self.timeout = get_http_timeout()
+        # Response cache (exact, plus semantic with LLM_CACHE_SEMANTIC=1); LLM_CACHE=0 disables it
+        self.cache = get_llm_cache() if os.getenv("LLM_CACHE", "1") == "1" else None
 
-    def __call__(self, prompt, image_url=None):
+    def __call__(self, prompt, image_url=None, use_cache=True, semantic_key=None, semantic_scope=None):
+        """Complete the prompt, serving repeats from the response cache.
+
+        use_cache=False bypasses the cache for this call. semantic_key (e.g. the
+        user's question) and semantic_scope (e.g. the user id) opt the call into
+        the semantic tier.
+        """
         # Convert PromptValue to string if needed
         if hasattr(prompt, 'to_string'):
             prompt = prompt.to_string()
 
+        cache = self.cache if use_cache and not image_url else None
+        if cache:
+            cached = cache.get(str(prompt), OPENROUTER_MODEL, self.temperature, semantic_key, semantic_scope)
+            if cached is not None:
+                print("Serving LLM response from cache")
+                return cached
+
+        content, model = self._generate(prompt, image_url)
+        # Entries are looked up under OPENROUTER_MODEL, so fallback answers are not cached
+        if cache and model == OPENROUTER_MODEL and content and content not in FAILURE_MESSAGES:
+            cache.put(str(prompt), OPENROUTER_MODEL, self.temperature, content, semantic_key, semantic_scope)
+        return content
+
+    def _generate(self, prompt, image_url=None):
+        """Return (content, model that answered); model is None for the failure messages"""
+
         # Prepare payload (same as before)
         message_content = [{"type": "text", "text": str(prompt)}]
         if image_url:
@@ -33,37 +119,45 @@ class OpenRouterLLM:
 
         max_attempts = 3
         backoff_base = 1.5
+        # Shared per-provider breakers: while OpenRouter's is open, go straight to the fallback
+        openrouter = get_circuit_breaker("openrouter")
 
         for attempt in range(1, max_attempts + 1):
+            if not openrouter.allow():
+                print("OpenRouter circuit open - routing to secondary provider")
+                break
+            started = time.monotonic()
             try:
                 print(f"Sending request to OpenRouter API (attempt {attempt})...")
-                response = requests.post(
+                response = self.session.post(
                     f"{BASE_URL}/chat/completions",
                     headers=self.headers,
                     json={
-                        "model": "mistralai/mistral-small-3.2-24b-instruct:free",
+                        "model": OPENROUTER_MODEL,
                         "messages": [{"role": "user", "content": message_content}],
                         "temperature": self.temperature,
                         "max_tokens": 1000,
                         "stream": False
                     },
-                    timeout=30
+                    timeout=self.timeout
                 )
 
                 print(f"OpenRouter API Response Status: {response.status_code}")
 
                 if response.status_code == 200:
+                    openrouter.record_success(time.monotonic() - started)
                     response_json = response.json()
                     if not response_json.get("choices"):
                         print(f"Unexpected API response format: {response_json}")
-                        return "Sorry, received an unexpected response format."
+                        return UNEXPECTED_FORMAT_MESSAGE, None
                     content = response_json["choices"][0]["message"]["content"]
-                    return content
+                    return content, OPENROUTER_MODEL
 
                 # On 5xx treat as transient and retry
                 if 500 <= response.status_code < 600:
+                    openrouter.record_failure()
                     print(f"OpenRouter transient error {response.status_code}: {response.text}")
-                    if attempt < max_attempts:
+                    if attempt < max_attempts and openrouter.state == CLOSED:
                         sleep_for = backoff_base ** attempt
                         print(f"Retrying after {sleep_for:.1f}s...")
                         time.sleep(sleep_for)
@@ -75,15 +169,18 @@ class OpenRouterLLM:
 
                 # Handle specific 4xx responses: 429 (rate limit) -> try fallback
                 if response.status_code == 429:
+                    openrouter.record_failure()
                     print(f"OpenRouter rate-limited (429): {response.text} - falling back to secondary provider")
                     break
-                # Other non-retryable 4xx errors: log & return friendly message
+                # Other non-retryable 4xx errors: the provider is up, the request was rejected
+                openrouter.record_success(time.monotonic() - started)
                 print(f"OpenRouter API Error: {response.status_code} - {response.text}")
-                return "Sorry, there was an error with the API request."
+                return API_ERROR_MESSAGE, None
 
             except requests.exceptions.RequestException as e:
+                openrouter.record_failure()
                 print(f"Network or timeout error calling OpenRouter: {e}")
-                if attempt < max_attempts:
+                if attempt < max_attempts and openrouter.state == CLOSED:
                     sleep_for = backoff_base ** attempt
                     time.sleep(sleep_for)
                     continue
@@ -91,52 +188,245 @@ class OpenRouterLLM:
                     print("Max retries reached due to network errors.")
                     break
 
-        # Fallback behavior after retries exhausted:
-        # Try OpenAI as a secondary provider if an API key is present
+        # Fallback behavior after retries exhausted (or while OpenRouter's circuit is open):
+        # Try OpenAI as a secondary provider if an API key is present and it is healthy
         openai_key = os.getenv("OPENAI_API_KEY")
         if openai_key:
+            fallback = get_circuit_breaker("openai")
+            if fallback.allow():
+                started = time.monotonic()
+                try:
+                    content = self._openai_fallback(openai_key, prompt)
+                    fallback.record_success(time.monotonic() - started)
+                    return content, OPENAI_FALLBACK_MODEL
+                except Exception as e:
+                    fallback.record_failure()
+                    print(f"OpenAI fallback failed: {e}")
+            else:
+                print("OpenAI circuit open - no healthy provider")
+
+        # Final graceful fallback
+        return UNAVAILABLE_MESSAGE, None
+
+    def _openai_fallback(self, openai_key, prompt):
+        # Use the new OpenAI client if available (openai>=1.0.0)
+        try:
+            client = get_openai_client(openai_key)
+            print("Calling OpenAI (new SDK) as fallback provider...")
+            resp = client.chat.completions.create(
+                model=OPENAI_FALLBACK_MODEL,
+                messages=[{"role": "user", "content": str(prompt)}],
+                temperature=self.temperature,
+                max_tokens=800
+            )
+            # response shape: resp.choices[0].message.content
+            content = None
             try:
-                # Use the new OpenAI client if available (openai>=1.0.0)
+                content = resp.choices[0].message.content
+            except Exception:
                 try:
-                    from openai import OpenAI
-                    client = OpenAI(api_key=openai_key)
-                    print("Calling OpenAI (new SDK) as fallback provider...")
-                    resp = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[{"role": "user", "content": str(prompt)}],
-                        temperature=self.temperature,
-                        max_tokens=800
-                    )
-                    # response shape: resp.choices[0].message.content
-                    content = None
-                    try:
-                        content = resp.choices[0].message.content
-                    except Exception:
-                        try:
-                            content = resp.choices[0]['message']['content']
-                        except Exception:
-                            content = str(resp)
-                    return content
+                    content = resp.choices[0]['message']['content']
                 except Exception:
-                    # Fall back to older openai import style for older packages
-                    import openai
-                    openai.api_key = openai_key
-                    print("Calling OpenAI (legacy SDK) as fallback provider...")
-                    resp = openai.ChatCompletion.create(
-                        model="gpt-4o-mini",
-                        messages=[{"role": "user", "content": str(prompt)}],
-                        temperature=self.temperature,
-                        max_tokens=800
-                    )
-                    try:
-                        content = resp.choices[0].message.content
-                    except Exception:
-                        content = resp.choices[0].text if hasattr(resp.choices[0], 'text') else str(resp)
-                    return content
+                    content = str(resp)
+            return content
+        except Exception:
+            # Fall back to older openai import style for older packages
+            import openai
+            openai.api_key = openai_key
+            print("Calling OpenAI (legacy SDK) as fallback provider...")
+            resp = openai.ChatCompletion.create(
+                model=OPENAI_FALLBACK_MODEL,
+                messages=[{"role": "user", "content": str(prompt)}],
+                temperature=self.temperature,
+                max_tokens=800
+            )
+            try:
+                content = resp.choices[0].message.content
+            except Exception:
+                content = resp.choices[0].text if hasattr(resp.choices[0], 'text') else str(resp)
+            return content
+
+    def stream(self, prompt, image_url=None, cancel_event=None, use_cache=True, semantic_key=None, semantic_scope=None):
+        """Streaming counterpart of __call__; a cached answer is yielded as a single chunk.
+
+        Only answers OpenRouter streamed to completion are cached. If the
+        provider fails after the first token, StreamInterruptedError is raised.
+        """
+        if hasattr(prompt, 'to_string'):
+            prompt = prompt.to_string()
+
+        cache = self.cache if use_cache and not image_url else None
+        if cache:
+            cached = cache.get(str(prompt), OPENROUTER_MODEL, self.temperature, semantic_key, semantic_scope)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        outcome = {}
+        tokens = self._stream(prompt, image_url, cancel_event, outcome)
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+        finally:
+            tokens.close()
+
+        content = "".join(parts)
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        answered_by = outcome.get("model")
+        if cache and answered_by == OPENROUTER_MODEL and content and not cancelled and content not in FAILURE_MESSAGES:
+            cache.put(str(prompt), OPENROUTER_MODEL, self.temperature, content, semantic_key, semantic_scope)
+
+    def _stream(self, prompt, image_url=None, cancel_event=None, outcome=None):
+        """Yield the answer incrementally as the provider generates it.
+
+        Parses OpenRouter's server-sent events; retries and falls back to OpenAI
+        (also streamed) the same way __call__ does, but only until the first
+        token has been sent. Setting cancel_event, or closing the generator,
+        stops reading and releases the upstream connection. When the answer
+        completes, outcome["model"] (if outcome is given) names the model that
+        produced it.
+        """
+        if outcome is None:
+            outcome = {}
+        if hasattr(prompt, 'to_string'):
+            prompt = prompt.to_string()
+
+        message_content = [{"type": "text", "text": str(prompt)}]
+        if image_url:
+            message_content.append({"type": "image_url", "image_url": {"url": image_url}})
+
+        max_attempts = 3
+        backoff_base = 1.5
+        openrouter = get_circuit_breaker("openrouter")
+
+        for attempt in range(1, max_attempts + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if not openrouter.allow():
+                print("OpenRouter circuit open - routing to secondary provider")
+                break
+            started = time.monotonic()
+            started_streaming = False
+            try:
+                print(f"Sending streaming request to OpenRouter API (attempt {attempt})...")
+                response = self.session.post(
+                    f"{BASE_URL}/chat/completions",
+                    headers=self.headers,
+                    json={
+                        "model": OPENROUTER_MODEL,
+                        "messages": [{"role": "user", "content": message_content}],
+                        "temperature": self.temperature,
+                        "max_tokens": 1000,
+                        "stream": True
+                    },
+                    timeout=self.timeout,
+                    stream=True
+                )
+                try:
+                    if response.status_code == 200:
+                        for token in self._iter_sse_tokens(response, cancel_event):
+                            if not started_streaming:
+                                # Latency to the first token is what the breaker judges streams by
+                                openrouter.record_success(time.monotonic() - started)
+                                started_streaming = True
+                            yield token
+                        if not started_streaming:
+                            openrouter.record_success(time.monotonic() - started)
+                        outcome["model"] = OPENROUTER_MODEL
+                        return
+
+                    if response.status_code == 429 or 500 <= response.status_code < 600:
+                        openrouter.record_failure()
+                    if 500 <= response.status_code < 600 and attempt < max_attempts and openrouter.state == CLOSED:
+                        print(f"OpenRouter transient error {response.status_code}: {response.text}")
+                        time.sleep(backoff_base ** attempt)
+                        continue
+                    if response.status_code == 429 or 500 <= response.status_code < 600:
+                        print(f"OpenRouter unavailable ({response.status_code}) - falling back to secondary provider")
+                        break
+                    openrouter.record_success(time.monotonic() - started)
+                    print(f"OpenRouter API Error: {response.status_code} - {response.text}")
+                    yield API_ERROR_MESSAGE
+                    return
+                finally:
+                    response.close()
+
+            except requests.exceptions.RequestException as e:
+                print(f"Network or timeout error streaming from OpenRouter: {e}")
+                openrouter.record_failure()
+                if started_streaming:
+                    # Part of the answer is already out; don't restart it from another provider
+                    raise StreamInterruptedError(str(e)) from e
+                if attempt < max_attempts and openrouter.state == CLOSED:
+                    time.sleep(backoff_base ** attempt)
+                    continue
+                break
+
+        openai_key = os.getenv("OPENAI_API_KEY")
+        fallback = get_circuit_breaker("openai")
+        if openai_key and fallback.allow():
+            started = time.monotonic()
+            sent = False
+            try:
+                for token in self._stream_openai(openai_key, prompt, cancel_event):
+                    if not sent:
+                        fallback.record_success(time.monotonic() - started)
+                        sent = True
+                    yield token
+                if not sent:
+                    fallback.record_success(time.monotonic() - started)
+                outcome["model"] = OPENAI_FALLBACK_MODEL
+                return
             except Exception as e:
-                print(f"OpenAI fallback failed: {e}")
+                print(f"OpenAI streaming fallback failed: {e}")
+                fallback.record_failure()
+                if sent:
+                    raise StreamInterruptedError(str(e)) from e
+        elif openai_key:
+            print("OpenAI circuit open - no healthy provider")
 
-        # Final graceful fallback
-        return "Sorry, the language model is temporarily unavailable — please try again in a few minutes."
+        yield UNAVAILABLE_MESSAGE
 
+    @staticmethod
+    def _iter_sse_tokens(response, cancel_event=None):
+        """Content deltas from an OpenAI-style SSE body ("data: {...}" lines, ended by "data: [DONE]")"""
+        for line in response.iter_lines(decode_unicode=True):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            done, content, error = parse_sse_line(line)
+            if error:
+                raise requests.exceptions.RequestException(f"Stream error: {error}")
+            if content:
+                yield content
+            if done:
+                return
+        # The body ended without "[DONE]" or a finish_reason: the answer was cut off
+        raise requests.exceptions.ChunkedEncodingError("Stream ended before the answer was complete")
 
+    def _stream_openai(self, openai_key, prompt, cancel_event=None):
+        client = get_openai_client(openai_key)
+        print("Streaming from OpenAI as fallback provider...")
+        stream = client.chat.completions.create(
+            model=OPENAI_FALLBACK_MODEL,
+            messages=[{"role": "user", "content": str(prompt)}],
+            temperature=self.temperature,
+            max_tokens=800,
+            stream=True
+        )
+        try:
+            finished = False
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finished = True
+            if not finished:
+                raise StreamInterruptedError("OpenAI stream ended before the answer was complete")
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
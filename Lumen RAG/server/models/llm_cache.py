@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_LLM_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "cache", "llm_responses.sqlite3")
+)
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse indentation and whitespace so reformatted copies of a prompt share a key"""
+    return WHITESPACE.sub(" ", prompt).strip()
+
+
+class LLMResponseCache:
+    """SQLite-backed LLM response cache with TTL and size eviction.
+
+    The exact tier is keyed by sha256(model, temperature, normalized prompt).
+    The optional semantic tier reuses a cached answer when the embedding of a
+    caller-supplied key (usually the user's question) is within
+    semantic_threshold cosine similarity of a cached one in the same scope
+    (e.g. the same user), since the full prompt also carries per-user context.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl_seconds: float = None,
+        max_entries: int = None,
+        semantic_threshold: float = None,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
+        self.path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH)
+        self.ttl_seconds = ttl_seconds or float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+        self.semantic_threshold = semantic_threshold or float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+        self.embed_fn = embed_fn
+        self._lock = threading.Lock()
+        self._semantic_index: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                semantic_scope TEXT,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_scope ON llm_responses (semantic_scope)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float) -> str:
+        return hashlib.sha256(f"{model}\x00{temperature}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, model: str, temperature: float, semantic_key: str = None, semantic_scope: str = None) -> Optional[str]:
+        key = self.make_key(prompt, model, temperature)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row:
+                self._touch(key, now)
+                self.exact_hits += 1
+                return row[0]
+
+        if semantic_key and self.embed_fn:
+            response = self._semantic_lookup(self._scope(model, temperature, semantic_scope), semantic_key, now)
+            if response is not None:
+                return response
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, prompt: str, model: str, temperature: float, response: str, semantic_key: str = None, semantic_scope: str = None) -> None:
+        key = self.make_key(prompt, model, temperature)
+        scope = None
+        embedding = None
+        if semantic_key and self.embed_fn:
+            scope = self._scope(model, temperature, semantic_scope)
+            vector = self._normalized(self.embed_fn([semantic_key])[0])
+            embedding = array("f", vector.tolist()).tobytes()
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, semantic_scope, embedding, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, scope, embedding, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+            if scope is not None:
+                # Rebuilt from SQLite on the next semantic lookup in this scope
+                self._semantic_index.pop(scope, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def _semantic_lookup(self, scope: str, semantic_key: str, now: float) -> Optional[str]:
+        query = self._normalized(self.embed_fn([semantic_key])[0])
+        with self._lock:
+            keys, matrix = self._load_scope(scope, now)
+            if not keys:
+                return None
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.semantic_threshold:
+                return None
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE key = ? AND created_at > ?",
+                (keys[best], now - self.ttl_seconds)
+            ).fetchone()
+            if not row:
+                self._semantic_index.pop(scope, None)
+                return None
+            self._touch(keys[best], now)
+            self.semantic_hits += 1
+            return row[0]
+
+    def _load_scope(self, scope: str, now: float) -> Tuple[List[str], np.ndarray]:
+        cached = self._semantic_index.get(scope)
+        if cached is None:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM llm_responses WHERE semantic_scope = ? AND embedding IS NOT NULL AND created_at > ?",
+                (scope, now - self.ttl_seconds)
+            ).fetchall()
+            keys = [row[0] for row in rows]
+            matrix = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows], dtype=np.float32)
+            cached = (keys, matrix)
+            self._semantic_index[scope] = cached
+        return cached
+
+    def _touch(self, key: str, now: float) -> None:
+        self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        expired = self._conn.execute("DELETE FROM llm_responses WHERE created_at <= ?", (now - self.ttl_seconds,)).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        if expired or count > self.max_entries:
+            self._semantic_index.clear()
+
+    @staticmethod
+    def _scope(model: str, temperature: float, semantic_scope: str = None) -> str:
+        return f"{model}\x00{temperature}\x00{semantic_scope or ''}"
+
+    @staticmethod
+    def _normalized(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_caches: Dict[str, LLMResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(path: str = None) -> LLMResponseCache:
+    """Return the process-wide response cache for a path.
+
+    The semantic tier is enabled with LLM_CACHE_SEMANTIC=1 and embeds keys with
+    the shared (itself cached) embedding model.
+    """
+    path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH)
+    cache = _caches.get(path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(path)
+            if cache is None:
+                embed_fn = None
+                if os.getenv("LLM_CACHE_SEMANTIC", "0") == "1":
+                    from models.embedding_model import EmbeddingModel
+                    embed_fn = EmbeddingModel().get_embeddings
+                cache = LLMResponseCache(path=path, embed_fn=embed_fn)
+                _caches[path] = cache
+    return cache
@@ -0,0 +1,35 @@
+import os
+import threading
+
+DEFAULT_SPACY_MODEL = "en_core_web_md"
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_nlp(model_name: str = None):
+    """Return a process-wide spaCy pipeline, loading it on first use.
+
+    The model defaults to en_core_web_md and can be swapped for a smaller one
+    (e.g. en_core_web_sm) with the SPACY_MODEL environment variable.
+    """
+    name = model_name or os.getenv("SPACY_MODEL", DEFAULT_SPACY_MODEL)
+
+    nlp = _models.get(name)
+    if nlp is not None:
+        return nlp
+
+    with _models_lock:
+        nlp = _models.get(name)
+        if nlp is None:
+            # Imported here so processes that never ingest documents don't pay for spaCy
+            import spacy
+            try:
+                nlp = spacy.load(name)
+            except OSError as e:
+                raise OSError(
+                    f"spaCy model '{name}' is not installed. Install it with: python -m spacy download {name}"
+                ) from e
+            print(f"Loaded spaCy model: {name}")
+            _models[name] = nlp
+    return nlp
@@ -0,0 +1,161 @@
+import os
+import re
+import copy
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_PROFILE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "user_profiles")
+)
+DEFAULT_PROFILE_DB = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "user_profiles.sqlite3")
+)
+
+
+def default_profile(user_id: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "risk_tolerance": "moderate",
+        "financial_goals": ["retirement", "investment"],
+        "investment_horizon": "long-term",
+        "preferences": {
+            "sustainability": 0.5,
+            "technology": 0.5,
+            "healthcare": 0.5
+        },
+        "interaction_history": []
+    }
+
+
+class ProfileStore:
+    """User profiles behind a write-through in-memory cache and per-user locks.
+
+    Reads are served from memory after the first load. Changes go through
+    update(), which runs the read-modify-write under the user's lock, so
+    concurrent requests for the same user cannot overwrite each other.
+    Backends only implement _load and _save.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._user_locks: Dict[str, threading.RLock] = {}
+        self._locks_lock = threading.Lock()
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """Return a copy of the profile, creating the default one on first access"""
+        with self._lock_for(user_id):
+            return copy.deepcopy(self._get_cached(user_id))
+
+    def update(self, user_id: str, mutate: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """Apply mutate(profile) to the latest profile and persist it atomically"""
+        with self._lock_for(user_id):
+            profile = copy.deepcopy(self._get_cached(user_id))
+            mutate(profile)
+            self._save(user_id, profile)
+            self._cache[user_id] = profile
+            return copy.deepcopy(profile)
+
+    def put(self, user_id: str, profile: Dict[str, Any]) -> None:
+        with self._lock_for(user_id):
+            self._save(user_id, profile)
+            self._cache[user_id] = copy.deepcopy(profile)
+
+    def _get_cached(self, user_id: str) -> Dict[str, Any]:
+        profile = self._cache.get(user_id)
+        if profile is None:
+            profile = self._load(user_id)
+            if profile is None:
+                profile = default_profile(user_id)
+                self._save(user_id, profile)
+            self._cache[user_id] = profile
+        return profile
+
+    def _lock_for(self, user_id: str) -> threading.RLock:
+        with self._locks_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = threading.RLock()
+                self._user_locks[user_id] = lock
+            return lock
+
+    def _load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class JsonProfileStore(ProfileStore):
+    """One JSON file per user under data/user_profiles, replaced atomically on write"""
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or os.getenv("PROFILE_STORE_PATH", DEFAULT_PROFILE_DIR)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _profile_path(self, user_id: str) -> str:
+        safe_user = re.sub(r"[^A-Za-z0-9_\-.@]", "_", user_id)
+        return os.path.join(self.path, f"{safe_user}.json")
+
+    def _load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        profile_path = self._profile_path(user_id)
+        if not os.path.exists(profile_path):
+            return None
+        with open(profile_path, "r") as f:
+            return json.load(f)
+
+    def _save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        profile_path = self._profile_path(user_id)
+        # Unique temp name so concurrent writers never share a partially written file
+        tmp_path = f"{profile_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(tmp_path, profile_path)
+
+
+class SqliteProfileStore(ProfileStore):
+    """Profiles as JSON rows in a single SQLite database (WAL mode)"""
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or os.getenv("PROFILE_STORE_PATH", DEFAULT_PROFILE_DB)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn_lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                user_id TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn_lock:
+            row = self._conn.execute("SELECT profile FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        with self._conn_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(profile), datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+
+def create_profile_store(backend: str = None) -> ProfileStore:
+    """Profile store for PROFILE_STORE_BACKEND: "json" (default) or "sqlite" """
+    backend = (backend or os.getenv("PROFILE_STORE_BACKEND", "json")).lower()
+    if backend == "json":
+        return JsonProfileStore()
+    if backend == "sqlite":
+        return SqliteProfileStore()
+    raise ValueError(f"Unknown profile store backend: {backend}")
@@ -0,0 +1,179 @@
+import os
+from typing import Dict
+import numpy as np
+
+
+class _Quantizer:
+    """Shared training policy: train once there is enough data, retrain after 4x growth"""
+
+    min_train_size = 1
+    trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        raise NotImplementedError
+
+    def needs_training(self, size: int) -> bool:
+        if size < self.min_train_size:
+            return False
+        return not self.trained or size >= 4 * self.trained_size
+
+
+class ScalarQuantizer(_Quantizer):
+    """int8 scalar quantization with a per-dimension offset and scale (4x smaller than float32)"""
+
+    name = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, min_train_size: int = None):
+        self.min_train_size = min_train_size or int(os.getenv("SQ_MIN_TRAIN_SIZE", "256"))
+        self.offset = None
+        self.scale = None
+
+    @property
+    def trained(self) -> bool:
+        return self.offset is not None
+
+    def code_width(self, dimension: int) -> int:
+        return dimension
+
+    def train(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        self.offset = low
+        self.scale = scale.astype(np.float32)
+        self.trained_size = len(vectors)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.round((np.asarray(vectors, dtype=np.float32) - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        """Approximate dot products: x ~= offset + scale * (code + 128)"""
+        weights = (query * self.scale).astype(np.float32)
+        base = float(query @ (self.offset + 128 * self.scale))
+        out = np.empty(len(codes), dtype=np.float32)
+        # Batches bound the temporary float32 copy of the codes
+        for start in range(0, len(codes), batch_size):
+            out[start:start + batch_size] = codes[start:start + batch_size].astype(np.float32) @ weights + base
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale, "trained_size": np.asarray(self.trained_size)}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.offset = state["offset"]
+        self.scale = state["scale"]
+        self.trained_size = int(state["trained_size"])
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if not self.trained else self.offset.nbytes + self.scale.nbytes
+
+
+class ProductQuantizer(_Quantizer):
+    """Product quantization: each vector becomes `m` one-byte sub-codebook ids.
+
+    With 768 dims and m=96 a vector takes 96 bytes instead of 3072 (32x).
+    Scores use asymmetric distance computation: the query stays in float32 and
+    is compared against the sub-codebooks through a lookup table.
+    """
+
+    name = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, m: int = None, ksub: int = 256, min_train_size: int = None, seed: int = 0):
+        self.m = m or int(os.getenv("PQ_SUBVECTORS", "96"))
+        self.ksub = ksub
+        self.min_train_size = min_train_size or int(os.getenv("PQ_MIN_TRAIN_SIZE", "4096"))
+        self.seed = seed
+        self.codebooks = None  # (m, ksub, dsub)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def code_width(self, dimension: int) -> int:
+        return self.m
+
+    def train(self, vectors: np.ndarray, n_iter: int = 8) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dimension = vectors.shape
+        if dimension % self.m:
+            raise ValueError(f"Dimension {dimension} is not divisible into {self.m} sub-vectors")
+        dsub = dimension // self.m
+        ksub = min(self.ksub, n)
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = ksub * 40
+        sample = vectors[rng.choice(n, sample_size, replace=False)] if n > sample_size else vectors
+
+        codebooks = np.zeros((self.m, ksub, dsub), dtype=np.float32)
+        for j in range(self.m):
+            codebooks[j] = self._kmeans(sample[:, j * dsub:(j + 1) * dsub], ksub, n_iter, rng)
+        self.codebooks = codebooks
+        self.trained_size = n
+
+    def encode(self, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dsub = self.codebooks.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start:start + batch_size]
+            for j in range(self.m):
+                codes[start:start + batch_size, j] = self._nearest(batch[:, j * dsub:(j + 1) * dsub], self.codebooks[j])
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        dsub = self.codebooks.shape[2]
+        # lookup[j, c] = query sub-vector j . centroid c of sub-codebook j
+        lookup = np.einsum("jd,jcd->jc", query.reshape(self.m, dsub).astype(np.float32), self.codebooks)
+        subspaces = np.arange(self.m)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), batch_size):
+            out[start:start + batch_size] = lookup[subspaces, codes[start:start + batch_size]].sum(axis=1)
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks, "trained_size": np.asarray(self.trained_size)}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.codebooks = state["codebooks"]
+        self.m = self.codebooks.shape[0]
+        self.trained_size = int(state["trained_size"])
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if not self.trained else self.codebooks.nbytes
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+        return np.argmin(distances, axis=1)
+
+    @classmethod
+    def _kmeans(cls, vectors: np.ndarray, k: int, n_iter: int, rng) -> np.ndarray:
+        centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = cls._nearest(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=k)
+            empty = counts == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.maximum(counts, 1)[:, None])
+        return centroids
+
+
+def create_quantizer(name: str):
+    """Quantizer for LOCAL_VECTOR_QUANTIZATION: "none", "int8" or "pq" """
+    name = (name or "none").lower()
+    if name == "none":
+        return None
+    if name == "int8":
+        return ScalarQuantizer()
+    if name == "pq":
+        return ProductQuantizer()
+    raise ValueError(f"Unknown vector quantization: {name}")
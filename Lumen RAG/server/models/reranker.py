@@ -0,0 +1,178 @@
+import os
+import re
+import math
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any
+from models.bm25_index import tokenize
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+TICKER_PATTERN = re.compile(r"\b[A-Z]{2,5}\b")
+
+_cross_encoders = {}
+_cross_encoders_lock = threading.Lock()
+
+
+def get_cross_encoder(model_name: str = None):
+    """Return a process-wide sentence-transformers CrossEncoder, loading it on first use"""
+    name = model_name or os.getenv("RERANKER_MODEL", DEFAULT_CROSS_ENCODER)
+
+    model = _cross_encoders.get(name)
+    if model is not None:
+        return model
+
+    with _cross_encoders_lock:
+        model = _cross_encoders.get(name)
+        if model is None:
+            # Optional dependency: only needed when RERANKER=cross-encoder
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError(
+                    "RERANKER=cross-encoder requires sentence-transformers. Install it with: pip install sentence-transformers"
+                ) from e
+            model = CrossEncoder(name, device="cpu")
+            print(f"Loaded cross-encoder: {name}")
+            _cross_encoders[name] = model
+    return model
+
+
+class _Reranker:
+    """Rescore retrieval candidates and keep the best top_n.
+
+    Scorers that judge each (query, candidate text) pair on its own have the
+    scores cached in a small LRU, so repeated queries and candidates shared
+    between queries are not scored twice. Scorers whose scores depend on the
+    whole candidate set declare pairwise = False and always score it together.
+    """
+
+    name = "none"
+    pairwise = True
+
+    def __init__(self, top_n: int = None, cache_size: int = None):
+        self.top_n = top_n or int(os.getenv("RERANK_TOP_N", "10"))
+        self.cache_size = cache_size or int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        raise NotImplementedError
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], top_n: int = None) -> List[Dict[str, Any]]:
+        """Return the top_n candidates ({"text", "score", ...}) ordered by rerank score.
+
+        The original retrieval score is kept under "retrieval_score".
+        """
+        if not candidates:
+            return []
+
+        texts = [candidate["text"] for candidate in candidates]
+        if self.pairwise:
+            scores = self._cached_scores(query, texts)
+        else:
+            scores = [float(value) for value in self.score(query, texts)]
+
+        reranked = [
+            dict(candidate, score=score, retrieval_score=candidate.get("score"))
+            for candidate, score in zip(candidates, scores)
+        ]
+        reranked.sort(key=lambda candidate: candidate["score"], reverse=True)
+        return reranked[:top_n or self.top_n]
+
+    def _cached_scores(self, query: str, texts: List[str]) -> List[float]:
+        keys = [self._cache_key(query, text) for text in texts]
+        scores: Dict[str, float] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            fresh = self.score(query, [texts[i] for i in missing])
+            with self._lock:
+                for i, value in zip(missing, fresh):
+                    scores[keys[i]] = float(value)
+                    self._cache[keys[i]] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [scores[key] for key in keys]
+
+    def _cache_key(self, query: str, text: str) -> str:
+        return hashlib.sha256(f"{self.name}\x00{query}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class LexicalReranker(_Reranker):
+    """Dependency-free scorer: BM25 over the candidate set plus query-term coverage.
+
+    Exact matches on tickers and figures count double, since those are the
+    terms a dense retriever most often ranks too low in financial filings.
+    idf and average length come from the candidate set, so scores are not cached.
+    """
+
+    name = "lexical"
+    pairwise = False
+
+    def __init__(self, top_n: int = None, cache_size: int = None, k1: float = 1.2, b: float = 0.75):
+        super().__init__(top_n, cache_size)
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return [0.0] * len(texts)
+        tickers = {ticker.lower() for ticker in TICKER_PATTERN.findall(query)}
+        boosts = {term: 2.0 if term[0].isdigit() or term in tickers else 1.0 for term in query_terms}
+
+        documents = [Counter(tokenize(text)) for text in texts]
+        lengths = [sum(document.values()) for document in documents]
+        avg_length = (sum(lengths) / len(lengths)) or 1.0
+        document_frequency = {term: sum(1 for document in documents if term in document) for term in query_terms}
+
+        scores = []
+        for document, length in zip(documents, lengths):
+            bm25 = 0.0
+            matched = 0.0
+            for term in query_terms:
+                tf = document.get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                bm25 += boosts[term] * idf * tf * (self.k1 + 1) / (tf + norm)
+                matched += boosts[term]
+            coverage = matched / sum(boosts.values())
+            scores.append(bm25 * (0.5 + coverage))
+        return scores
+
+
+class CrossEncoderReranker(_Reranker):
+    """Small CPU cross-encoder (ms-marco MiniLM by default) scoring query/chunk pairs in batches"""
+
+    name = "cross-encoder"
+
+    def __init__(self, top_n: int = None, cache_size: int = None, model_name: str = None, batch_size: int = None):
+        super().__init__(top_n, cache_size)
+        self.model_name = model_name or os.getenv("RERANKER_MODEL", DEFAULT_CROSS_ENCODER)
+        self.name = f"cross-encoder:{self.model_name}"
+        self.batch_size = batch_size or int(os.getenv("RERANKER_BATCH_SIZE", "32"))
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        model = get_cross_encoder(self.model_name)
+        return list(model.predict([(query, text) for text in texts], batch_size=self.batch_size))
+
+
+def create_reranker(name: str = None):
+    """Reranker for RERANKER: "none" (default), "lexical" or "cross-encoder" """
+    name = (name or os.getenv("RERANKER", "none")).lower()
+    if name == "none":
+        return None
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "cross-encoder":
+        return CrossEncoderReranker()
+    raise ValueError(f"Unknown reranker: {name}")
@@ -0,0 +1,87 @@
+import os
+import re
+from typing import List, Callable, Optional
+from models.nlp_model import get_nlp
+from models.ner_model import FINANCIAL_ENTITY_TYPES
+
+# Multi-word phrases are matched before single words so "net income" wins over "income"
+FINANCIAL_TERMS = [
+    "earnings per share", "free cash flow", "operating cash flow", "cash flow", "net income", "gross margin",
+    "operating margin", "operating income", "net revenue", "total revenue", "revenue", "sales", "ebitda", "ebit",
+    "eps", "profit", "loss", "expenses", "operating expenses", "cost of revenue", "goodwill", "impairment",
+    "assets", "liabilities", "total assets", "total liabilities", "shareholders equity", "equity", "debt",
+    "long-term debt", "interest rate", "interest expense", "dividend", "dividends", "share buyback",
+    "stock repurchase", "market cap", "market capitalization", "valuation", "p/e ratio", "price to earnings",
+    "guidance", "forecast", "outlook", "inflation", "recession", "volatility", "liquidity", "credit rating",
+    "stock", "stocks", "bond", "bonds", "treasury", "etf", "etfs", "index fund", "index funds", "mutual fund",
+    "mutual funds", "actively managed funds", "portfolio", "asset allocation", "diversification", "rebalancing",
+    "risk profile", "risk tolerance", "retirement", "retirement portfolio", "401(k)", "ira", "roth ira",
+    "pension", "annuity", "mortgage", "refinancing", "real estate", "tax", "taxes", "tax liability",
+    "capital gains", "tax-loss harvesting", "emergency fund", "savings", "budget", "insurance", "estate planning"
+]
+
+TICKER_PATTERN = re.compile(r"\b[A-Z]{2,5}\b")
+
+
+def _dictionary_pattern(terms: List[str]) -> re.Pattern:
+    alternatives = sorted({term.lower() for term in terms}, key=len, reverse=True)
+    return re.compile(r"(?<![\w])(" + "|".join(re.escape(term) for term in alternatives) + r")(?![\w])")
+
+
+class TermExtractor:
+    """Local key-term extraction for graph lookups: dictionary phrases, tickers, entities and noun chunks.
+
+    Replaces an LLM round trip per advice query. When nothing is found locally and
+    an LLM fallback is given (SEARCH_TERMS_LLM_FALLBACK=1), the LLM is asked instead.
+    """
+
+    def __init__(self, nlp=None, terms: List[str] = FINANCIAL_TERMS, llm_fallback: Optional[Callable[[str], str]] = None, max_terms: int = None):
+        self._nlp = nlp
+        self.dictionary = _dictionary_pattern(terms)
+        self.llm_fallback = llm_fallback
+        self.max_terms = max_terms or int(os.getenv("SEARCH_TERMS_MAX", "10"))
+
+    @property
+    def nlp(self):
+        """The full spaCy pipeline (noun chunks need the parser), from the process-wide cache"""
+        if self._nlp is None:
+            self._nlp = get_nlp()
+        return self._nlp
+
+    def extract(self, query: str) -> List[str]:
+        terms = [match.group(1) for match in self.dictionary.finditer(query.lower())]
+        terms.extend(ticker.lower() for ticker in TICKER_PATTERN.findall(query))
+
+        try:
+            doc = self.nlp(query)
+            terms.extend(ent.text.lower() for ent in doc.ents if ent.label_ in FINANCIAL_ENTITY_TYPES)
+            for chunk in doc.noun_chunks:
+                # Drop leading determiners/pronouns ("my retirement portfolio" -> "retirement portfolio")
+                tokens = [token for token in chunk if not (token.is_stop or token.pos_ in ("DET", "PRON"))]
+                if tokens:
+                    terms.append(" ".join(token.text for token in tokens).lower())
+        except Exception as e:
+            print(f"Error extracting search terms with spaCy: {str(e)}")
+
+        unique_terms = []
+        for term in terms:
+            term = term.strip()
+            if len(term) > 1 and term not in unique_terms:
+                unique_terms.append(term)
+
+        if not unique_terms and self.llm_fallback:
+            unique_terms = self._extract_with_llm(query)
+
+        return unique_terms[:self.max_terms]
+
+    def _extract_with_llm(self, query: str) -> List[str]:
+        search_prompt = f"""
+        Extract the key financial entities, concepts, or metrics in this query.
+        Return only a comma-separated list of the key terms, with no explanation.
+
+        Query: "{query}"
+
+        Key terms:
+        """
+        search_terms = self.llm_fallback(search_prompt).split(",")
+        return [term.strip().lower() for term in search_terms if term.strip()]
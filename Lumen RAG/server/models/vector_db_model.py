@@ -1,54 +1,31 @@
-from pinecone import Pinecone, ServerlessSpec
 from models.embedding_model import EmbeddingModel
+from models.vector_store import create_vector_store
+from models.reranker import create_reranker
 from typing import List, Dict, Any
 from pathlib import Path
 from uuid import uuid4
 import os
-import time
 
 class VectorDBModel:
     def __init__(self, api_key=None, index_name="financial-documents"):
         self.api_key = api_key or os.getenv("PINECONE_API_KEY")
         self.index_name = index_name
         self.embedding_model = EmbeddingModel()
-        self._setup_pinecone()
+        self.reranker = create_reranker()
+        self._setup_vector_store()
         
-    def _setup_pinecone(self):
-        """Set up the Pinecone client and index"""
+    def _setup_vector_store(self):
+        """Set up the vector store (Pinecone or local, per VECTOR_STORE_BACKEND)"""
         try:
-            # Initialize Pinecone
-            pc = Pinecone(api_key=self.api_key)
-            
-            # Check if index exists
-            existing_indexes = pc.list_indexes().names()
-            print(f"Existing indexes: {existing_indexes}")
-            
-            # Create index if it doesn't exist
-            if self.index_name not in existing_indexes:
-                print(f"Creating new index: {self.index_name}")
-                pc.create_index(
-                    name=self.index_name,
-                    dimension=768,  # Using Google's embedding model dimension
-                    metric="cosine",
-                    spec=ServerlessSpec(
-                        cloud="aws",
-                        region="us-east-1"
-                    )
-                )
-                print(f"Created new Pinecone index: {self.index_name}")
-                # Wait for index to be ready
-                time.sleep(10)
-            
-            # Connect to index
-            self.vector_db = pc.Index(self.index_name)
+            self.vector_db = create_vector_store(index_name=self.index_name, api_key=self.api_key)
             
             # Test the connection
-            stats = self.vector_db.describe_index_stats()
+            stats = self.vector_db.describe()
             print(f"Connected to index with stats: {stats}")
             return True
             
         except Exception as e:
-            print(f"Error setting up Pinecone: {str(e)}")
+            print(f"Error setting up vector store: {str(e)}")
             return False
     
     def store_document_chunks(self, chunks, document_path, user_id):
@@ -73,13 +50,8 @@ class VectorDBModel:
                     "metadata": metadata
                 })
             
-            # Upsert vectors in batches of 100
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:min(i+batch_size, len(vectors))]
-                self.vector_db.upsert(vectors=batch)
-            
-            return len(vectors)
+            # The store batches the upsert itself
+            return self.vector_db.upsert(vectors)
         except Exception as e:
             print(f"Error storing document chunks: {str(e)}")
             return 0
@@ -97,13 +69,12 @@ class VectorDBModel:
             results = self.vector_db.query(
                 vector=query_embedding,
                 top_k=top_k,
-                include_metadata=True,
                 filter=filter_dict
             )
             
             # Extract text and metadata
             matches = []
-            for match in getattr(results, "matches", []):
+            for match in results:
                 matches.append({
                     "text": match["metadata"].get("text", ""),
                     "score": match["score"],
@@ -111,6 +82,10 @@ class VectorDBModel:
                     "chunk_index": match["metadata"].get("chunk_index", -1)
                 })
             
+            # Keep only the best candidates when a reranker is configured
+            if self.reranker:
+                matches = self.reranker.rerank(query, matches)
+            
             return matches
         except Exception as e:
             print(f"Error searching vector DB: {str(e)}")
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+from models.ann_index import IVFFlatIndex
+from models.quantization import create_quantizer
+
+EMBEDDING_DIMENSION = 768  # Google text-embedding-004
+DEFAULT_LOCAL_STORE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "vector_store")
+)
+
+
+class VectorStore:
+    """Backend-neutral vector store used by VectorDBModel and the advisor.
+
+    Records are {"id", "values", "metadata"}; query results are
+    {"id", "score", "metadata"} ordered by descending score.
+    """
+
+    def upsert(self, records: List[Dict[str, Any]]) -> int:
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone serverless index"""
+
+    def __init__(self, index_name: str, api_key: str = None, dimension: int = EMBEDDING_DIMENSION):
+        # Imported here so the local backend works without the Pinecone client installed
+        from pinecone import Pinecone, ServerlessSpec
+
+        self.index_name = index_name
+        pc = Pinecone(api_key=api_key or os.getenv("PINECONE_API_KEY"))
+
+        existing_indexes = pc.list_indexes().names()
+        print(f"Existing indexes: {existing_indexes}")
+
+        if index_name not in existing_indexes:
+            print(f"Creating new index: {index_name}")
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"
+                )
+            )
+            print(f"Created new Pinecone index: {index_name}")
+            # Wait for index to be ready
+            time.sleep(10)
+
+        self.index = pc.Index(index_name)
+
+    def upsert(self, records: List[Dict[str, Any]]) -> int:
+        # Upsert in batches of 100
+        batch_size = 100
+        for i in range(0, len(records), batch_size):
+            self.index.upsert(vectors=records[i:i + batch_size])
+        return len(records)
+
+    def query(self, vector: List[float], top_k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter=filter
+        )
+        matches = getattr(results, "matches", None)
+        if matches is None:
+            matches = results.get("matches", [])
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match["metadata"] or {}}
+            for match in matches
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        return self.index.describe_index_stats()
+
+
+class LocalVectorStore(VectorStore):
+    """In-process cosine index over a float32 matrix, persisted to disk.
+
+    Vectors are L2-normalised on insert so cosine similarity is a dot product.
+    Rows are indexed by user_id, so per-user queries only touch that user's
+    vectors. Saved stores are reopened memory-mapped and only copied into RAM
+    on the first write.
+
+    With index_type="ivf" (LOCAL_VECTOR_INDEX) queries whose candidate set is
+    larger than exact_search_threshold go through an IVF-flat ANN index;
+    smaller candidate sets, e.g. one small tenant, are still searched exactly.
+
+    With quantization="int8" or "pq" (LOCAL_VECTOR_QUANTIZATION) only the
+    compact codes stay in RAM. Candidates are scored on the codes and the best
+    top_k * rerank_factor are re-ranked against the full-precision vectors,
+    which are read from the memory-mapped file on disk.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        dimension: int = EMBEDDING_DIMENSION,
+        autosave: bool = True,
+        index_type: str = None,
+        ann_index: IVFFlatIndex = None,
+        exact_search_threshold: int = None,
+        quantization: str = None,
+        rerank_factor: int = None
+    ):
+        self.path = path or os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(DEFAULT_LOCAL_STORE_DIR, "financial-documents"))
+        self.dimension = dimension
+        self.autosave = autosave
+        self.index_type = (index_type or os.getenv("LOCAL_VECTOR_INDEX", "flat")).lower()
+        if self.index_type not in ("flat", "ivf"):
+            raise ValueError(f"Unknown local vector index type: {self.index_type}")
+        self.ann_index = ann_index or (IVFFlatIndex() if self.index_type == "ivf" else None)
+        self.exact_search_threshold = exact_search_threshold if exact_search_threshold is not None else int(
+            os.getenv("LOCAL_VECTOR_EXACT_THRESHOLD", "5000")
+        )
+        self.quantization = (quantization or os.getenv("LOCAL_VECTOR_QUANTIZATION", "none")).lower()
+        self.quantizer = create_quantizer(self.quantization)
+        self.rerank_factor = rerank_factor or int(os.getenv("LOCAL_VECTOR_RERANK_FACTOR", "4"))
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._codes: Optional[np.ndarray] = None
+        self._count = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._rows_by_user: Dict[str, List[int]] = {}
+        self._load()
+
+    def upsert(self, records: List[Dict[str, Any]]) -> int:
+        if not records:
+            return 0
+        with self._lock:
+            values = np.asarray([record["values"] for record in records], dtype=np.float32)
+            if values.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dim vectors, got {values.shape[1]}")
+            values = self._normalize(values)
+
+            self._ensure_capacity(self._count + len(records))
+            written_rows = []
+            for record, vector in zip(records, values):
+                metadata = dict(record.get("metadata") or {})
+                row = self._row_by_id.get(record["id"])
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(record["id"])
+                    self._metadata.append(metadata)
+                    self._row_by_id[record["id"]] = row
+                    self._rows_by_user.setdefault(metadata.get("user_id"), []).append(row)
+                else:
+                    old_user = self._metadata[row].get("user_id")
+                    if old_user != metadata.get("user_id"):
+                        self._rows_by_user[old_user].remove(row)
+                        self._rows_by_user.setdefault(metadata.get("user_id"), []).append(row)
+                    self._metadata[row] = metadata
+                self._vectors[row] = vector
+                written_rows.append(row)
+
+            written_rows = np.asarray(written_rows, dtype=np.int64)
+            self._update_ann_index(written_rows)
+            self._update_quantizer(written_rows)
+
+            if self.autosave:
+                self.save()
+        return len(records)
+
+    def query(self, vector: List[float], top_k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._candidate_rows(filter)
+            if rows is not None and len(rows) == 0:
+                return []
+
+            query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+            candidate_count = self._count if rows is None else len(rows)
+            if candidate_count == 0:
+                return []
+
+            if self.ann_index is not None and self.ann_index.trained and candidate_count > self.exact_search_threshold:
+                rows = self.ann_index.candidates(query, top_k, allowed=rows)
+                if len(rows) == 0:
+                    return []
+
+            top_rows, top_scores = self._score(query, rows, top_k)
+
+            return [
+                {"id": self._ids[row], "score": float(score), "metadata": self._metadata[row]}
+                for row, score in zip(top_rows.tolist(), top_scores.tolist())
+            ]
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "local",
+                "path": self.path,
+                "dimension": self.dimension,
+                "total_vector_count": self._count,
+                "index_type": self.index_type,
+                "ann_trained": bool(self.ann_index is not None and self.ann_index.trained),
+                "quantization": self.quantization,
+                "quantizer_trained": bool(self.quantizer is not None and self.quantizer.trained),
+                "resident_vector_bytes": self.resident_vector_bytes(),
+                "users": len([user for user, rows in self._rows_by_user.items() if rows])
+            }
+
+    def resident_vector_bytes(self) -> int:
+        """RAM held for vector data: codes plus codebooks, or the float32 matrix when not quantized"""
+        with self._lock:
+            total = 0
+            if not isinstance(self._vectors, np.memmap):
+                total += self._vectors[:self._count].nbytes
+            if self._quantized:
+                total += self._codes[:self._count].nbytes + self.quantizer.nbytes
+            return total
+
+    def save(self) -> None:
+        """Write vectors and metadata to disk, replacing the previous files atomically"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            vectors_path = os.path.join(self.path, "vectors.npy")
+            metadata_path = os.path.join(self.path, "metadata.json")
+
+            tmp_vectors = vectors_path + ".tmp"
+            with open(tmp_vectors, "wb") as f:
+                np.save(f, self._vectors[:self._count])
+            tmp_metadata = metadata_path + ".tmp"
+            with open(tmp_metadata, "w") as f:
+                json.dump({"ids": self._ids, "metadata": self._metadata}, f)
+
+            os.replace(tmp_vectors, vectors_path)
+            os.replace(tmp_metadata, metadata_path)
+
+            if self.ann_index is not None and self.ann_index.trained:
+                centroids_path = os.path.join(self.path, "ivf_centroids.npy")
+                tmp_centroids = centroids_path + ".tmp"
+                with open(tmp_centroids, "wb") as f:
+                    np.save(f, self.ann_index.centroids)
+                os.replace(tmp_centroids, centroids_path)
+
+            if self._quantized:
+                codes_path = os.path.join(self.path, f"{self.quantization}_codes.npy")
+                tmp_codes = codes_path + ".tmp"
+                with open(tmp_codes, "wb") as f:
+                    np.save(f, self._codes[:self._count])
+                os.replace(tmp_codes, codes_path)
+
+                quantizer_path = os.path.join(self.path, f"{self.quantization}_quantizer.npz")
+                tmp_quantizer = quantizer_path + ".tmp"
+                with open(tmp_quantizer, "wb") as f:
+                    np.savez(f, **self.quantizer.state())
+                os.replace(tmp_quantizer, quantizer_path)
+
+                # Only the codes need to stay resident; re-ranking reads the full vectors from disk
+                self._vectors = np.load(vectors_path, mmap_mode="r")
+
+    def _load(self) -> None:
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        metadata_path = os.path.join(self.path, "metadata.json")
+        if not (os.path.exists(vectors_path) and os.path.exists(metadata_path)):
+            return
+
+        with open(metadata_path, "r") as f:
+            stored = json.load(f)
+        # Memory-mapped until the first write forces a copy
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._count = self._vectors.shape[0]
+        self._ids = stored["ids"]
+        self._metadata = stored["metadata"]
+        for row, (vector_id, metadata) in enumerate(zip(self._ids, self._metadata)):
+            self._row_by_id[vector_id] = row
+            self._rows_by_user.setdefault(metadata.get("user_id"), []).append(row)
+
+        # Reuse saved centroids; assigning rows is one pass, retraining is not needed
+        centroids_path = os.path.join(self.path, "ivf_centroids.npy")
+        if self.ann_index is not None and os.path.exists(centroids_path):
+            self.ann_index.set_centroids(np.load(centroids_path))
+            self.ann_index.assign(np.arange(self._count), self._vectors[:self._count])
+            self.ann_index.trained_size = self._count
+        else:
+            self._update_ann_index(np.arange(self._count))
+
+        codes_path = os.path.join(self.path, f"{self.quantization}_codes.npy")
+        quantizer_path = os.path.join(self.path, f"{self.quantization}_quantizer.npz")
+        if self.quantizer is not None and os.path.exists(codes_path) and os.path.exists(quantizer_path):
+            with np.load(quantizer_path) as state:
+                self.quantizer.load_state(dict(state))
+            self._codes = np.load(codes_path)
+        else:
+            self._update_quantizer(np.arange(self._count))
+
+    @property
+    def _quantized(self) -> bool:
+        return self.quantizer is not None and self.quantizer.trained and self._codes is not None
+
+    def _update_quantizer(self, rows: np.ndarray) -> None:
+        """Train the quantizer once enough vectors exist (re-encoding everything), otherwise encode new rows"""
+        if self.quantizer is None or self._count == 0:
+            return
+        if self.quantizer.needs_training(self._count):
+            self.quantizer.train(self._vectors[:self._count])
+            self._codes = self.quantizer.encode(self._vectors[:self._count])
+        elif self._quantized and len(rows):
+            if self._codes.shape[0] < self._count:
+                capacity = max(self._count, 2 * self._codes.shape[0])
+                grown = np.zeros((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+                grown[:self._codes.shape[0]] = self._codes
+                self._codes = grown
+            self._codes[rows] = self.quantizer.encode(self._vectors[rows])
+
+    def _score(self, query: np.ndarray, rows: Optional[np.ndarray], top_k: int):
+        """Top rows and cosine scores among `rows` (None for all), re-ranking code scores when quantized"""
+        if self._quantized:
+            codes = self._codes[:self._count] if rows is None else self._codes[rows]
+            approximate = self.quantizer.scores(query, codes)
+            shortlist_size = min(len(approximate), top_k * self.rerank_factor)
+            shortlist = np.argpartition(-approximate, shortlist_size - 1)[:shortlist_size]
+            # Sorted rows keep reads from the memory-mapped vectors sequential
+            rows = np.sort(shortlist if rows is None else rows[shortlist])
+
+        if rows is None:
+            scores = self._vectors[:self._count] @ query
+            rows = np.arange(self._count)
+        else:
+            scores = self._vectors[rows] @ query
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def _update_ann_index(self, rows: np.ndarray) -> None:
+        """Train the ANN index once enough vectors exist, otherwise add the new rows to it"""
+        if self.ann_index is None or self._count == 0:
+            return
+        if self.ann_index.needs_training(self._count):
+            self.ann_index.rebuild(self._vectors[:self._count])
+        elif self.ann_index.trained and len(rows):
+            self.ann_index.assign(rows, self._vectors[rows])
+
+    def _ensure_capacity(self, needed: int) -> None:
+        writable = isinstance(self._vectors, np.ndarray) and not isinstance(self._vectors, np.memmap)
+        if writable and self._vectors.shape[0] >= needed:
+            return
+        capacity = max(needed, 2 * self._vectors.shape[0], 64)
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:self._count] = self._vectors[:self._count]
+        self._vectors = grown
+
+    def _candidate_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows matching an equality filter, or None for all rows"""
+        if not filter:
+            return None
+
+        conditions = {key: (value.get("$eq") if isinstance(value, dict) else value) for key, value in filter.items()}
+        if "user_id" in conditions:
+            rows = self._rows_by_user.get(conditions.pop("user_id"), [])
+        else:
+            rows = range(self._count)
+        if conditions:
+            rows = [
+                row for row in rows
+                if all(self._metadata[row].get(key) == value for key, value in conditions.items())
+            ]
+        return np.asarray(rows, dtype=np.int64)
+
+    @staticmethod
+    def _normalize(values: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return values / norms
+
+
+def create_vector_store(backend: str = None, index_name: str = "financial-documents", api_key: str = None) -> VectorStore:
+    """Build the vector store selected by VECTOR_STORE_BACKEND ("pinecone" or "local")"""
+    backend = (backend or os.getenv("VECTOR_STORE_BACKEND", "pinecone")).lower()
+    if backend == "pinecone":
+        return PineconeVectorStore(index_name=index_name, api_key=api_key)
+    if backend == "local":
+        path = os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(DEFAULT_LOCAL_STORE_DIR, index_name))
+        return LocalVectorStore(path=path)
+    raise ValueError(f"Unknown vector store backend: {backend}")
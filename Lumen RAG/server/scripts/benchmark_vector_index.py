@@ -0,0 +1,100 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+import argparse
+import tempfile
+import numpy as np
+from models.ann_index import IVFFlatIndex
+from models.vector_store import LocalVectorStore
+
+
+def synthetic_corpus(n_vectors, dimension, n_clusters=200, seed=0):
+    """Clustered vectors, a rough stand-in for chunk embeddings of many filings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dimension))
+    labels = rng.integers(n_clusters, size=n_vectors)
+    vectors = centers[labels] + 1.5 * rng.normal(size=(n_vectors, dimension))
+    return vectors.astype(np.float32)
+
+
+def build_store(vectors, index_type, nlist, quantization="none"):
+    store = LocalVectorStore(
+        path=tempfile.mkdtemp(prefix="vector_bench_"),
+        dimension=vectors.shape[1],
+        # Quantized stores are saved so their full-precision vectors drop out of RAM
+        autosave=quantization != "none",
+        index_type=index_type,
+        ann_index=IVFFlatIndex(nlist=nlist, min_train_size=1) if index_type == "ivf" else None,
+        exact_search_threshold=0,
+        quantization=quantization
+    )
+    records = [
+        {"id": f"chunk_{i}", "values": vector, "metadata": {"user_id": "bench"}}
+        for i, vector in enumerate(vectors)
+    ]
+    started = time.perf_counter()
+    store.upsert(records)
+    return store, time.perf_counter() - started
+
+
+def run_queries(store, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        matches = store.query(query, top_k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({match["id"] for match in matches})
+    return results, latencies
+
+
+def recall_at_k(approximate_results, exact_results):
+    return np.mean([
+        len(approx & exact) / max(len(exact), 1)
+        for approx, exact in zip(approximate_results, exact_results)
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k, latency and memory of ANN and quantized vs exact search")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.vectors, args.dimension)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.3 * rng.normal(size=queries.shape).astype(np.float32)
+
+    exact_store, exact_build = build_store(vectors, "flat", args.nlist)
+    exact_results, exact_latencies = run_queries(exact_store, queries, args.k)
+
+    ivf_store, ivf_build = build_store(vectors, "ivf", args.nlist)
+
+    print(f"{args.vectors} vectors x {args.dimension} dims, {args.queries} queries, k={args.k}")
+    print(f"Build: exact {exact_build:.2f}s, ivf (nlist={args.nlist}) {ivf_build:.2f}s\n")
+    print(f"{'index':<16}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}")
+    print(f"{'exact':<16}{1.0:>10.3f}{np.mean(exact_latencies):>10.3f}{np.percentile(exact_latencies, 95):>10.3f}")
+
+    for nprobe in (1, 2, 4, 8, 16, 32):
+        ivf_store.ann_index.nprobe = nprobe
+        ivf_results, ivf_latencies = run_queries(ivf_store, queries, args.k)
+        recall = recall_at_k(ivf_results, exact_results)
+        label = f"ivf nprobe={nprobe}"
+        print(f"{label:<16}{recall:>10.3f}{np.mean(ivf_latencies):>10.3f}{np.percentile(ivf_latencies, 95):>10.3f}")
+
+    float_bytes = exact_store.resident_vector_bytes()
+    print(f"\n{'quantization':<16}{'recall@k':>10}{'mean ms':>10}{'MiB':>10}{'ratio':>8}")
+    print(f"{'float32':<16}{1.0:>10.3f}{np.mean(exact_latencies):>10.3f}{float_bytes / 2**20:>10.1f}{1.0:>7.1f}x")
+    for quantization in ("int8", "pq"):
+        store, _ = build_store(vectors, "flat", args.nlist, quantization=quantization)
+        results, latencies = run_queries(store, queries, args.k)
+        resident = store.resident_vector_bytes()
+        print(
+            f"{quantization + ' + rerank':<16}{recall_at_k(results, exact_results):>10.3f}"
+            f"{np.mean(latencies):>10.3f}{resident / 2**20:>10.1f}{float_bytes / resident:>7.1f}x"
+        )
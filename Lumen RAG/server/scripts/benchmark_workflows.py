@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+from tools import Tool_1_Financial_Report_Generator as report_tool
+from tools import personalized_financial_advisor as advisor_tool
+from tools.workflow_registry import WorkflowRegistry
+
+ITERATIONS = 50
+
+
+def time_per_call(fn, iterations=ITERATIONS):
+    """Average wall time of fn() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark_workflow(name, builder):
+    """Compare rebuilding the graph per request against a registry lookup"""
+    rebuild_ms = time_per_call(builder)
+
+    registry = WorkflowRegistry()
+    registry.register(name, builder)
+    first_use_ms = time_per_call(lambda: registry.get(name), iterations=1)
+    cached_ms = time_per_call(lambda: registry.get(name))
+
+    return {
+        "workflow": name,
+        "rebuild_per_request_ms": rebuild_ms,
+        "registry_first_use_ms": first_use_ms,
+        "registry_per_request_ms": cached_ms,
+        "speedup": rebuild_ms / cached_ms if cached_ms else float("inf")
+    }
+
+
+if __name__ == "__main__":
+    # Nodes are never invoked here, so the advisor workflow is built without a live advisor
+    results = [
+        benchmark_workflow("financial_report", report_tool.build_workflow),
+        benchmark_workflow("financial_advisor", lambda: advisor_tool.build_workflow(advisor=None)),
+    ]
+
+    print(f"Per-request graph construction cost ({ITERATIONS} iterations)")
+    for r in results:
+        print(f"\n{r['workflow']}")
+        print(f"  before (build + compile per request): {r['rebuild_per_request_ms']:.3f} ms")
+        print(f"  after, first use (compile once):      {r['registry_first_use_ms']:.3f} ms")
+        print(f"  after, per request (registry lookup): {r['registry_per_request_ms']:.5f} ms")
+        print(f"  speedup: {r['speedup']:.0f}x")
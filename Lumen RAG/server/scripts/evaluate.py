@@ -4,6 +4,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import time
 from models.evaluation_model import evaluate_response
 from tools.personalized_financial_advisor import PersonalizedFinancialAdvisor
+from models.embedding_cache import get_embedding_cache
 from utils.token_counter import estimate_tokens_from_context
 import json
 import pandas as pd
@@ -20,6 +21,12 @@ MODEL_RESPONSE_TOKEN_RATE = 0.10 / 1_000_000 # Per token
 JUDGE_NAME = "gemini-1.5-flash"
 LLM_NAME = "mistralai/mistral-small-3.2-24b-instruct:free"
 
+# Keys of retrieve_context()["timings"], reported per query and averaged in the summary
+TIMING_STAGES = [
+    "embedding_ms", "vector_ms", "bm25_ms", "search_terms_ms", "graph_ms",
+    "retrieval_ms", "fusion_ms", "rerank_ms", "packing_ms"
+]
+
 
 # def evaluate_financial_advice(query: str, user_id: str):
 #     """Get and evaluate a response from the financial advisor"""
@@ -103,7 +110,12 @@ def run_comprehensive_evaluation(user_id: str):
                 "response": response,
                 "contexts": contexts["vector_contexts"],
                 "evaluation": evaluation_results,
-                "token_usage": token_usage
+                "token_usage": token_usage,
+                # Chunks/tokens retrieved vs. what the context packer kept
+                "packing": contexts.get("packing", {}),
+                # Per-stage retrieval latency (embedding_ms, vector_ms, bm25_ms, graph_ms, ...)
+                "timings": contexts.get("timings", {}),
+                "degraded_sources": contexts.get("degraded_sources", [])
             })
             
             # Add a significant delay between queries
@@ -137,6 +149,8 @@ def run_comprehensive_evaluation(user_id: str):
                 "query_tokens": result["token_usage"]["query_tokens"],
                 "response_tokens": result["token_usage"]["response_tokens"],
                 "total_tokens": result["token_usage"]["total_tokens"],
+                "retrieved_context_tokens": result["packing"].get("input_tokens"),
+                **{stage: result["timings"].get(stage) for stage in TIMING_STAGES},
                 "status": "Success"
             })
         else:
@@ -150,6 +164,8 @@ def run_comprehensive_evaluation(user_id: str):
                 "query_tokens": None,
                 "response_tokens": None,
                 "total_tokens": None,
+                "retrieved_context_tokens": None,
+                **{stage: None for stage in TIMING_STAGES},
                 "status": "Failed: " + result["error"]
             })
 
@@ -176,12 +192,18 @@ def run_comprehensive_evaluation(user_id: str):
         "total_tokens_used": df["total_tokens"].sum(skipna=True),
         "avg_tokens_per_query": df["total_tokens"].mean(skipna=True),
         "avg_context_tokens": df["context_tokens"].mean(skipna=True),
+        "avg_retrieved_context_tokens": df["retrieved_context_tokens"].mean(skipna=True),
         "avg_response_tokens": df["response_tokens"].mean(skipna=True),
         "max_tokens_query": df["total_tokens"].max(skipna=True),
         "context_cost": df["context_tokens"].sum() * MODEL_CONTEXT_TOKEN_RATE,
         "response_cost": df["response_tokens"].sum() * MODEL_RESPONSE_TOKEN_RATE,
         "total_token_cost": (df["context_tokens"].sum(skipna=True) * MODEL_CONTEXT_TOKEN_RATE + df["response_tokens"].sum(skipna=True) * MODEL_RESPONSE_TOKEN_RATE)
     }
+    # Mean and p95 latency of each retrieval stage that ran
+    for stage in TIMING_STAGES:
+        if df[stage].notna().any():
+            summary_stats[f"avg_{stage}"] = df[stage].mean(skipna=True)
+            summary_stats[f"p95_{stage}"] = df[stage].quantile(0.95)
     
     # Create visualization
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -267,6 +289,8 @@ def run_comprehensive_evaluation(user_id: str):
         json.dump({
             "detailed_results": all_results,
             "summary_stats": summary_stats,
+            # Embedding cache hit/miss counters for this run's process
+            "embedding_cache": get_embedding_cache().stats() if os.getenv("EMBEDDING_CACHE", "1") != "0" else None,
             "chart_path": os.path.basename(chart_path), # Store only basename
             "query_map": {f"Q{i+1}": query for i, query in enumerate(test_queries)}
         }, f, indent=2)
@@ -278,6 +302,8 @@ def run_comprehensive_evaluation(user_id: str):
     print(f"Average Context Relevance: {summary_stats.get('avg_context_relevance', 'N/A'):.2f}")
     print(f"Estimated API cost: ${context_cost + response_cost:.4f}")
     print(f"Success Rate: {summary_stats.get('success_rate', 'N/A'):.1f}%")
+    if "avg_retrieval_ms" in summary_stats:
+        print(f"Average Retrieval Latency: {summary_stats['avg_retrieval_ms']:.1f} ms (p95 {summary_stats['p95_retrieval_ms']:.1f} ms)")
     print(f"Detailed results saved to: {results_file}")
     print(f"Chart saved to: {chart_path}")
     
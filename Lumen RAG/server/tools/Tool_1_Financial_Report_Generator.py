@@ -11,6 +11,7 @@ from fpdf import FPDF
 import json
 from uuid import uuid4
 from models.llm import OpenRouterLLM
+from tools.workflow_registry import workflow_registry
 
 # Define the state to track data through the workflow
 class FinancialState(TypedDict):
@@ -283,6 +284,9 @@ def build_workflow():
     
     return workflow.compile()
 
+# Compiled once on first use and shared across requests and threads
+workflow_registry.register("financial_report", build_workflow)
+
 # Main function to run the tool
 def generate_financial_report(data_source: Any, data_type: str, report_id=None) -> str:
     """
@@ -304,7 +308,7 @@ def generate_financial_report(data_source: Any, data_type: str, report_id=None)
     if not report_id:
         report_id = str(uuid4())[:8]
 
-    workflow = build_workflow()
+    workflow = workflow_registry.get("financial_report")
     initial_state = FinancialState(
         data_source=data_source,
         data_type=data_type,
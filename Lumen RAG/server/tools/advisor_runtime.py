@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from models.embedding_model import EmbeddingModel
+from models.llm import OpenRouterLLM
+from models.vector_store import create_vector_store
+from models.graph_writer import Neo4jBulkWriter
+from models.bm25_index import BM25Store
+from models.reranker import create_reranker
+from models.profile_store import create_profile_store
+from utils.coalescing_queue import CoalescingQueue
+from neo4j import GraphDatabase
+
+VECTOR_INDEX_NAME = "financial-documents"
+
+
+class AdvisorRuntime:
+    """Long-lived clients shared by every PersonalizedFinancialAdvisor in the process.
+
+    Building the embedding client, the vector store handle, the Neo4j driver
+    (which owns its own connection pool) and the LLM client is expensive, so it
+    happens once per process instead of once per request or workflow node.
+    """
+
+    def __init__(self, index_name: str = VECTOR_INDEX_NAME):
+        self.index_name = index_name
+        self.health: Dict[str, Any] = {}
+
+        try:
+            self.embedding_model = EmbeddingModel()
+        except Exception as e:
+            print(f"Error initializing embedding model: {str(e)}")
+            raise
+
+        self.llm = OpenRouterLLM(api_key=os.getenv("OPENROUTER_GEMMA_API_KEY"), temperature=0.1)
+
+        try:
+            # Pinecone or the local in-process index, per VECTOR_STORE_BACKEND
+            self.vector_db = create_vector_store(index_name=index_name)
+        except Exception as e:
+            print(f"Error setting up vector store: {str(e)}")
+            raise
+
+        # Keyword (BM25) indexes live next to the embeddings for hybrid retrieval
+        self.keyword_index = BM25Store()
+
+        # Optional rescoring stage (RERANKER=lexical|cross-encoder); shared so its score cache is too
+        self.reranker = create_reranker()
+
+        # Shared pool that fans retrieval out to the vector store, BM25 and Neo4j concurrently
+        self.retrieval_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("RETRIEVAL_MAX_WORKERS", "8")),
+            thread_name_prefix="retrieval"
+        )
+
+        # Cached, lock-protected user profiles (JSON files or SQLite, per PROFILE_STORE_BACKEND)
+        self.profile_store = create_profile_store()
+
+        # Background profile-preference inference, batched per user
+        self.profile_updates = CoalescingQueue(name="profile-updates")
+
+        try:
+            self.neo4j_driver = self._connect_neo4j()
+        except Exception as e:
+            print(f"Error connecting to Neo4j: {str(e)}")
+            raise
+
+    def _connect_neo4j(self):
+        """Create the process-wide Neo4j driver (the driver pools connections itself)"""
+        neo4j_uri = os.getenv("NEO4J_URI")
+        neo4j_user = os.getenv("NEO4J_USER", "neo4j")
+        neo4j_password = os.getenv("NEO4J_PASSWORD")
+
+        if not neo4j_password:
+            raise ValueError("NEO4J_PASSWORD environment variable is not set")
+
+        return GraphDatabase.driver(
+            neo4j_uri,
+            auth=(neo4j_user, neo4j_password),
+            max_connection_pool_size=int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+        )
+
+    def health_check(self) -> Dict[str, Any]:
+        """Verify the vector store and Neo4j are reachable. Runs once at startup, not per request."""
+        started = time.perf_counter()
+
+        stats = self.vector_db.describe()
+        print(f"Connected to index with stats: {stats}")
+
+        with self.neo4j_driver.session() as session:
+            session.run("RETURN 1 AS test").consume()
+
+        # Fact lookups need the full-text and user_id indexes before the first ingestion creates them
+        try:
+            Neo4jBulkWriter(self.neo4j_driver).ensure_schema()
+        except Exception as e:
+            print(f"Error creating Neo4j indexes: {str(e)}")
+
+        self.health = {
+            "vector_index": self.index_name,
+            "neo4j": "ok",
+            "checked_at": time.time(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        return self.health
+
+    def close(self) -> None:
+        """Release pooled connections and worker threads"""
+        self.retrieval_pool.shutdown(wait=False)
+        try:
+            self.neo4j_driver.close()
+        except Exception as e:
+            print(f"Error closing Neo4j driver: {str(e)}")
+
+
+_runtime: Optional[AdvisorRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_advisor_runtime() -> AdvisorRuntime:
+    """Return the process-wide advisor runtime, creating and health-checking it on first use"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                runtime = AdvisorRuntime()
+                try:
+                    runtime.health_check()
+                except Exception:
+                    runtime.close()
+                    raise
+                _runtime = runtime
+    return _runtime
@@ -0,0 +1,285 @@
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+DEFAULT_JOBS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "data", "ingestion_jobs.sqlite3")
+)
+
+
+class IngestionJobStore:
+    """Persistent ingestion job records in SQLite.
+
+    Jobs move queued -> running -> completed | failed. Per-stage progress and
+    timings are kept as JSON so the status endpoint can show where a job is.
+    A running job is leased to the worker that claimed it (owner,
+    lease_expires_at); several processes can share one database, and a job
+    is only taken over once its owner has stopped renewing the lease.
+    Every claim counts as an attempt, so a document that keeps killing its
+    worker is failed after max_attempts instead of retried forever.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("INGESTION_JOBS_PATH", DEFAULT_JOBS_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                document_path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                current_stage TEXT,
+                stages TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                owner TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Databases created before leases and attempt counts existed
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(ingestion_jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("lease_expires_at", "REAL"), ("attempts", "INTEGER NOT NULL DEFAULT 0")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(self, user_id: str, document_path: str) -> str:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingestion_jobs (id, user_id, document_path, status, stages, created_at) VALUES (?, ?, ?, 'queued', '{}', ?)",
+                (job_id, user_id, document_path, datetime.now().isoformat())
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim_next(self, owner: str, lease_seconds: float, max_attempts: int = 3) -> Optional[Dict[str, Any]]:
+        """Lease the oldest claimable job to owner and return it.
+
+        Claimable means queued, or running under a lease that has expired
+        (its process crashed or was restarted); such a job starts over,
+        unless it has already been attempted max_attempts times, in which
+        case it is marked failed and skipped.
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM ingestion_jobs
+                    WHERE status = 'queued'
+                       OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?))
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                # Guarded on the state we read, so two processes can't both claim the row
+                guard = (row["id"], row["status"], row["owner"], row["lease_expires_at"])
+                if row["attempts"] >= max_attempts:
+                    error = f"Gave up after {row['attempts']} attempt(s); the worker never finished the job"
+                    cursor = self._conn.execute(
+                        """
+                        UPDATE ingestion_jobs
+                        SET status = 'failed', error = ?, finished_at = ?, lease_expires_at = NULL
+                        WHERE id = ? AND status = ? AND owner IS ? AND lease_expires_at IS ?
+                        """,
+                        (error, datetime.now().isoformat()) + guard
+                    )
+                    self._conn.commit()
+                    if cursor.rowcount == 1:
+                        print(f"Ingestion job {row['id']} failed: {error}")
+                    continue
+                cursor = self._conn.execute(
+                    """
+                    UPDATE ingestion_jobs
+                    SET status = 'running', owner = ?, lease_expires_at = ?, started_at = ?,
+                        current_stage = NULL, stages = '{}', attempts = attempts + 1
+                    WHERE id = ? AND status = ? AND owner IS ? AND lease_expires_at IS ?
+                    """,
+                    (owner, now + lease_seconds, datetime.now().isoformat()) + guard
+                )
+                self._conn.commit()
+                if cursor.rowcount == 1:
+                    break
+        if row["status"] == "running":
+            print(f"Reclaimed ingestion job {row['id']} from expired owner {row['owner']}")
+        job = self._to_dict(row)
+        job.update(status="running", owner=owner, current_stage=None, stages={}, attempts=row["attempts"] + 1)
+        return job
+
+    def renew_leases(self, job_ids: List[str], owner: str, lease_seconds: float) -> None:
+        """Extend the leases owner holds on job_ids"""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE ingestion_jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                [(time.time() + lease_seconds, job_id, owner) for job_id in job_ids]
+            )
+            self._conn.commit()
+
+    def update_stage(self, job_id: str, stage: str, info: Dict[str, Any]) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT stages FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"]) if row else {}
+            stages[stage] = dict(stages.get(stage, {}), **info)
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET current_stage = ?, stages = ? WHERE id = ?",
+                (stage, json.dumps(stages), job_id)
+            )
+            self._conn.commit()
+
+    def finish(self, job_id: str, result: Dict[str, Any], error: str = None, owner: str = None) -> None:
+        """Record the outcome; with owner, only if that owner still holds the job"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                "WHERE id = ? AND (? IS NULL OR owner = ?)",
+                ("failed" if error else "completed", json.dumps(result, default=str), error, datetime.now().isoformat(),
+                 job_id, owner, owner)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"]) if job["stages"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class IngestionWorkerPool:
+    """Worker threads that drain the job store through process_fn(document_path, user_id, progress).
+
+    Claimed jobs are leased for INGESTION_LEASE_SECONDS and a heartbeat
+    thread renews the leases while they run, so another process only takes
+    over jobs whose owner has died. A job is attempted at most
+    INGESTION_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, store: IngestionJobStore, process_fn: Callable[..., Dict[str, Any]], workers: int = None,
+                 poll_seconds: float = 5.0, lease_seconds: float = None, max_attempts: int = None):
+        self.store = store
+        self.process_fn = process_fn
+        self.workers = workers or int(os.getenv("INGESTION_WORKERS", "2"))
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds or float(os.getenv("INGESTION_LEASE_SECONDS", "120"))
+        self.max_attempts = max_attempts or int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"ingestion-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="ingestion-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user_id: str, document_path: str) -> str:
+        self.start()
+        job_id = self.store.create(user_id, document_path)
+        self._wake.set()
+        return job_id
+
+    def _work(self) -> None:
+        while True:
+            # Cleared before claiming so a submit that lands in between is not missed
+            self._wake.clear()
+            job = self.store.claim_next(self.owner, self.lease_seconds, self.max_attempts)
+            if job is None:
+                # Sleep until a submit wakes us (or poll, in case another process queued work)
+                self._wake.wait(self.poll_seconds)
+                continue
+            with self._lock:
+                self._active.add(job["id"])
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._active.discard(job["id"])
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                job_ids = list(self._active)
+            try:
+                self.store.renew_leases(job_ids, self.owner, self.lease_seconds)
+            except Exception as e:
+                print(f"Error renewing ingestion job leases: {str(e)}")
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        print(f"Starting ingestion job {job_id} for {job['document_path']}")
+
+        def progress(stage: str, info: Dict[str, Any]) -> None:
+            self.store.update_stage(job_id, stage, info)
+
+        try:
+            result = self.process_fn(job["document_path"], job["user_id"], progress=progress)
+            error = result.get("message") if result.get("status") == "error" else None
+            self.store.finish(job_id, result, error, owner=self.owner)
+        except Exception as e:
+            print(f"Error running ingestion job {job_id}: {str(e)}")
+            self.store.finish(job_id, {}, str(e), owner=self.owner)
+
+
+_ingestion_pool: Optional[IngestionWorkerPool] = None
+_ingestion_pool_lock = threading.Lock()
+
+
+def get_ingestion_pool() -> IngestionWorkerPool:
+    """Return the process-wide ingestion worker pool, started on first use.
+
+    The servers call this at startup so jobs interrupted by a restart resume
+    without waiting for the next upload.
+    """
+    global _ingestion_pool
+    if _ingestion_pool is None:
+        with _ingestion_pool_lock:
+            if _ingestion_pool is None:
+                # Imported here so the job store can be used without loading the advisor stack
+                from tools.personalized_financial_advisor import process_financial_document
+                pool = IngestionWorkerPool(IngestionJobStore(), process_financial_document)
+                pool.start()
+                _ingestion_pool = pool
+    return _ingestion_pool
@@ -16,28 +16,34 @@
 
 import os
 import json
+import time
+import hashlib
 import pandas as pd
-from typing import TypedDict, Dict, List, Any, Optional
+from typing import TypedDict, Dict, List, Any, Optional, Callable
 from datetime import datetime
 from pathlib import Path
+from functools import partial
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import networkx as nx
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from unstructured.partition.auto import partition
 from langgraph.graph import StateGraph, END
-from models.embedding_model import EmbeddingModel
-from models.llm import OpenRouterLLM
+from models.graph_writer import Neo4jBulkWriter
+from models.graph_search import GraphFactSearch
+from models.ner_model import EntityExtractor
+from models.term_extractor import TermExtractor
+from utils.rank_fusion import fuse_results
+from utils.context_packer import ContextPacker, format_fact, simhash_hex
+from utils.cooccurrence import CooccurrenceBuilder
+from tools.advisor_runtime import AdvisorRuntime, get_advisor_runtime
+from tools.workflow_registry import workflow_registry
 # from models.gemini_model import GeminiLLM
-from pinecone import Pinecone, ServerlessSpec
-from neo4j import GraphDatabase
-import spacy
 import matplotlib.pyplot as plt
-from uuid import uuid4
 # from models.evaluation_model import evaluate_response
 
 # Ensure necessary directories exist
 os.makedirs("data/documents", exist_ok=True)
 os.makedirs("data/knowledge_graphs", exist_ok=True)
-os.makedirs("data/user_profiles", exist_ok=True)
 
 # Define state to track data through workflow
 class FinancialAdvisorState(TypedDict):
@@ -51,117 +57,87 @@ class FinancialAdvisorState(TypedDict):
     knowledge_graph_id: Optional[str]  # Added this field
     relevant_contexts: Optional[List[str]]
     relevant_facts: Optional[List[Dict[str, Any]]]
+    retrieval_timings: Optional[Dict[str, float]]  # Per-stage latency in ms from retrieve_context
     user_profile: Optional[Dict[str, Any]]
     response: Optional[str]
     evaluation: Optional[Dict[str, Any]]
 
-# Initialize NLP model for entity extraction
-try:
-    nlp = spacy.load("en_core_web_md")
-except:
-    # Download if not available
-    import subprocess
-    subprocess.run(["python", "-m", "spacy", "download", "en_core_web_md"])
-    nlp = spacy.load("en_core_web_md")
-
 class PersonalizedFinancialAdvisor:
-    # Fix 4: Improved Neo4j initialization with error handling
-    def __init__(self):
-        """Initialize the financial advisor with necessary components"""
-        try:
-            self.embedding_model = EmbeddingModel()
-        except Exception as e:
-            print(f"Error initializing embedding model: {str(e)}")
-            raise
-
-        try:
-
-            self.llm = OpenRouterLLM(api_key=os.getenv("OPENROUTER_GEMMA_API_KEY"), temperature=0.1)
-            # self.llm = GeminiLLM(api_key=os.getenv("GOOGLE_API_KEY"))
-
-            # Pinecone setup
-
-            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-            index_name = "financial-documents"
-
-            # Check if index exists
-            existing_indexes = pc.list_indexes().names()  # Get list of index names
-            print(f"Existing indexes: {existing_indexes}")
-            
-            # Create index if it doesn't exist
-            if index_name not in existing_indexes:
-                print(f"Creating new index: {index_name}")
-                pc.create_index(
-                name=index_name,
-                dimension=768, # Replace with your model dimensions
-                metric="cosine", # Replace with your model metric
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-east-1"
-                ) 
-            )
-            print(f"Created new Pinecone index: {index_name}")
-            # Wait for index to be ready
-            import time
-            time.sleep(10)
-
-            # Connect to index
-            self.vector_db = pc.Index(index_name)
-            # Test the connection
-            stats = self.vector_db.describe_index_stats()
-            print(f"Connected to index with stats: {stats}")
-
-        except Exception as e:
-            print(f"Error setting up Pinecone: {str(e)}")
-            raise
-
-        try:
-            # Neo4j setup with proper error handling
-            self.neo4j_uri = os.getenv("NEO4J_URI")
-            self.neo4j_user = os.getenv("NEO4J_USER", "neo4j")
-            self.neo4j_password = os.getenv("NEO4J_PASSWORD")
-            
-            if not self.neo4j_password:
-                raise ValueError("NEO4J_PASSWORD environment variable is not set")
-                
-            self.neo4j_driver = GraphDatabase.driver(
-                self.neo4j_uri, 
-                auth=(self.neo4j_user, self.neo4j_password)
-            )
-            
-            # Test connection
-            with self.neo4j_driver.session() as session:
-                session.run("RETURN 1 AS test")
-        except Exception as e:
-            print(f"Error connecting to Neo4j: {str(e)}")
-            raise
+    def __init__(self, runtime: Optional[AdvisorRuntime] = None):
+        """Initialize the financial advisor on top of the shared process-wide runtime"""
+        self.runtime = runtime or get_advisor_runtime()
+        self.embedding_model = self.runtime.embedding_model
+        self.llm = self.runtime.llm
+        self.vector_db = self.runtime.vector_db
+        self.keyword_index = self.runtime.keyword_index
+        self.reranker = self.runtime.reranker
+        self.profile_store = self.runtime.profile_store
+        self.neo4j_driver = self.runtime.neo4j_driver
+        self.graph_writer = Neo4jBulkWriter(self.neo4j_driver)
+        self.graph_search = GraphFactSearch(self.neo4j_driver)
+        # The spaCy model itself is loaded lazily on the first ingestion
+        self.entity_extractor = EntityExtractor()
+        self.context_packer = ContextPacker()
+        # Search terms come from spaCy + a financial dictionary; the LLM is only an opt-in fallback
+        use_llm_fallback = os.getenv("SEARCH_TERMS_LLM_FALLBACK", "0") == "1"
+        self.term_extractor = TermExtractor(llm_fallback=self.llm if use_llm_fallback else None)
     
     # Fix 1: Add self parameter to class method
-    def process_financial_document(self, document_path: str, user_id: str) -> Dict:
-        """Process a financial document and build knowledge graph"""
+    def process_financial_document(self, document_path: str, user_id: str, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict:
+        """Process a financial document and build knowledge graph.
+
+        progress(stage, info), if given, is called when each stage starts and
+        finishes so background jobs can report where they are.
+        """
+        stage_timings = {}
+        
+        def run_stage(stage, fn, *args):
+            if progress:
+                progress(stage, {"status": "running"})
+            started = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                if progress:
+                    progress(stage, {"status": "failed", "error": str(e)})
+                raise
+            stage_timings[stage] = round(time.perf_counter() - started, 3)
+            if progress:
+                progress(stage, {"status": "completed", "seconds": stage_timings[stage]})
+            return result
+        
         try:
+            # Ids below derive from the content, so a retried job overwrites its earlier output
+            document_id = self._document_id(document_path)
+            
             # Extract chunks from document
-            chunks = self._chunk_document(document_path)
+            chunks = run_stage("chunking", self._chunk_document, document_path)
+            
+            # Store document embeddings in the vector store
+            records = run_stage("embedding", self._store_document_embeddings, chunks, document_path, user_id, document_id)
             
-            # Store document embeddings in Pinecone
-            self._store_document_embeddings(chunks, document_path, user_id)
+            # Index the same chunks for keyword (BM25) retrieval
+            run_stage("keyword_index", self.keyword_index.add_documents, user_id, records)
             
             # Extract entities and relationships
-            entities, relationships = self._extract_entities_and_relationships(chunks)
+            entities, relationships, ner_metrics = run_stage("entity_extraction", self._extract_entities_and_relationships, chunks)
             
             # Build knowledge graph in Neo4j
-            graph_id = self._build_knowledge_graph(entities, relationships, user_id)
+            graph_id, graph_write_stats = run_stage("graph_write", self._build_knowledge_graph, entities, relationships, user_id, document_id)
             
             # Visualize knowledge graph
             viz_path = f"data/knowledge_graphs/{user_id}_{Path(document_path).stem}_viz.png"
-            self.visualize_knowledge_graph(graph_id, viz_path)
+            run_stage("visualization", self.visualize_knowledge_graph, graph_id, viz_path)
             
             return {
                 "document_path": document_path,
                 "chunks_processed": len(chunks),
                 "entities_extracted": len(entities),
                 "relationships_extracted": len(relationships),
+                "ner_metrics": ner_metrics,
                 "knowledge_graph_id": graph_id,
+                "graph_write_stats": graph_write_stats,
+                "stage_timings": stage_timings,
                 "visualization_path": viz_path
             }
         except Exception as e:
@@ -169,9 +145,19 @@ class PersonalizedFinancialAdvisor:
             return {
                 "document_path": document_path,
                 "status": "error",
-                "message": f"Failed to process document: {str(e)}"
+                "message": f"Failed to process document: {str(e)}",
+                "stage_timings": stage_timings
             }
     
+    @staticmethod
+    def _document_id(document_path: str) -> str:
+        """Short content hash identifying the document across ingestion attempts"""
+        digest = hashlib.sha256()
+        with open(document_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()[:16]
+    
     def _chunk_document(self, document_path: str) -> List[str]:
         """Partition document into chunks for processing"""
         # Use unstructured to extract elements
@@ -191,30 +177,30 @@ class PersonalizedFinancialAdvisor:
         
         return chunks
     
-    def _store_document_embeddings(self, chunks: List[str], document_path: str, user_id: str) -> None:
-        """Generate embeddings and store in Pinecone vector DB"""
+    def _store_document_embeddings(self, chunks: List[str], document_path: str, user_id: str, document_id: str) -> List[Dict[str, Any]]:
+        """Generate embeddings, store them in the vector store and return the stored records"""
         try:
             # Generate embeddings for chunks
             embeddings = self.embedding_model.get_embeddings(chunks)
             
-            # Prepare records for Pinecone
+            # Prepare records for the vector store
             records = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                record_id = f"chunk_{user_id}_{Path(document_path).stem}_{i}_{uuid4()}"
+                # Stable per document and position: re-ingesting upserts instead of appending
+                record_id = f"chunk_{user_id}_{document_id}_{i}"
                 metadata = {
                     "document": Path(document_path).name,
                     "user_id": user_id,
                     "chunk_index": i,
                     "text": chunk,  # Store text in metadata for retrieval
+                    "simhash": simhash_hex(chunk),  # Near-duplicate fingerprint for context packing
                     "timestamp": datetime.now().isoformat()
                 }
-                records.append((record_id, embedding, metadata))
+                records.append({"id": record_id, "values": embedding, "metadata": metadata})
             
-            # Upsert in batches of 100
-            batch_size = 100
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i+batch_size]
-                self.vector_db.upsert(vectors=batch)
+            # The store batches the upsert itself
+            self.vector_db.upsert(records)
+            return records
                 
         except Exception as e:
             print(f"Error storing embeddings: {str(e)}")
@@ -225,39 +211,33 @@ class PersonalizedFinancialAdvisor:
         entities = []
         relationships = []
         
-        # Define financial entity types to extract
-        financial_entity_types = [
-            "MONEY", "ORG", "PERCENT", "DATE", "PRODUCT", "QUANTITY", "GPE"
-        ]
+        # One node per distinct (text, type) so repeated pairs collapse into one weighted edge
+        entity_index = {}
+        cooccurrence = CooccurrenceBuilder()
         
-        # Process each chunk to extract entities
-        for i, chunk in enumerate(chunks):
-            doc = nlp(chunk)
-            
-            # Extract named entities
-            chunk_entities = []
-            for ent in doc.ents:
-                if ent.label_ in financial_entity_types:
+        # Run NER over all chunks in batches, keeping only financial entity types
+        chunk_entities, ner_metrics = self.entity_extractor.extract(chunks)
+        
+        for i, found in enumerate(chunk_entities):
+            mentions = []
+            for ent in found:
+                key = (ent["text"].strip().lower(), ent["label"])
+                entity = entity_index.get(key)
+                if entity is None:
                     entity = {
                         "id": f"entity_{len(entities)}",
-                        "text": ent.text,
-                        "type": ent.label_,
+                        "text": ent["text"],
+                        "type": ent["label"],
                         "chunk_index": i
                     }
+                    entity_index[key] = entity
                     entities.append(entity)
-                    chunk_entities.append(entity)
+                mentions.append((entity["id"], ent["start"], ent["end"]))
             
-            # Extract relationships between entities in this chunk
-            for i, entity1 in enumerate(chunk_entities):
-                for j, entity2 in enumerate(chunk_entities):
-                    if i < j:  # Avoid duplicate relationships
-                        relationship = {
-                            "source": entity1["id"],
-                            "target": entity2["id"],
-                            "type": "co-occurrence",
-                            "context": chunk
-                        }
-                        relationships.append(relationship)
+            # Relate entities that appear within a few tokens of each other
+            cooccurrence.add_chunk(i, mentions)
+        
+        relationships.extend(cooccurrence.relationships())
         
         # Enhance with fact extraction from LLM
         if entities:
@@ -322,62 +302,18 @@ class PersonalizedFinancialAdvisor:
             except Exception as e:
                 print(f"Error extracting facts with LLM: {str(e)}")
         
-        return entities, relationships
+        return entities, relationships, ner_metrics
     
-    def _build_knowledge_graph(self, entities: List[Dict], relationships: List[Dict], user_id: str) -> str:
+    def _build_knowledge_graph(self, entities: List[Dict], relationships: List[Dict], user_id: str, document_id: str) -> tuple:
         """Build a knowledge graph in Neo4j from extracted entities and relationships"""
-        # Create a unique graph ID for this document
-        graph_id = f"{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        # One graph per user and document content: distinct documents never share a graph,
+        # and a retry replaces the graph an interrupted attempt left behind
+        graph_id = f"{user_id}_{document_id}"
         
-        with self.neo4j_driver.session() as session:
-            # Create constraint for unique entity IDs if it doesn't exist
-            session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE")
-            
-            # Add entities as nodes
-            for entity in entities:
-                session.run(
-                    """
-                    MERGE (e:Entity {
-                        id: $id,
-                        text: $text,
-                        type: $type,
-                        chunk_index: $chunk_index,
-                        user_id: $user_id,
-                        graph_id: $graph_id
-                    })
-                    """,
-                    id=entity["id"],
-                    text=entity["text"],
-                    type=entity["type"],
-                    chunk_index=entity.get("chunk_index", -1),
-                    user_id=user_id,
-                    graph_id=graph_id
-                )
-            
-            # Add relationships as edges
-            for rel in relationships:
-                session.run(
-                    """
-                    MATCH (source:Entity {id: $source_id})
-                    MATCH (target:Entity {id: $target_id})
-                    CREATE (source)-[r:RELATES {
-                        type: $type,
-                        context: $context,
-                        value: $value,
-                        user_id: $user_id,
-                        graph_id: $graph_id
-                    }]->(target)
-                    """,
-                    source_id=rel["source"],
-                    target_id=rel["target"],
-                    type=rel["type"],
-                    context=rel.get("context", ""),
-                    value=rel.get("value", ""),
-                    user_id=user_id,
-                    graph_id=graph_id
-                )
+        # Entities and relationships go out in UNWIND batches rather than one query per row
+        write_stats = self.graph_writer.write_graph(entities, relationships, user_id, graph_id)
         
-        return graph_id
+        return graph_id, write_stats
     
     def visualize_knowledge_graph(self, graph_id: str, output_path: str) -> str:
         """Visualize the Neo4j knowledge graph and save as an image"""
@@ -447,56 +383,25 @@ class PersonalizedFinancialAdvisor:
 
     def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user profile or create one if it doesn't exist"""
-        project_root = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)
-        )
-        profiles_dir = os.path.join(project_root, "server", "data", "user_profiles")
-        os.makedirs(profiles_dir, exist_ok=True)
-        profile_path = os.path.join(profiles_dir, f"{user_id}.json")
-        
-        if os.path.exists(profile_path):
-            with open(profile_path, 'r') as f:
-                return json.load(f)
-        else:
-            # Create default profile
-            default_profile = {
-                "user_id": user_id,
-                "risk_tolerance": "moderate",
-                "financial_goals": ["retirement", "investment"],
-                "investment_horizon": "long-term",
-                "preferences": {
-                    "sustainability": 0.5,
-                    "technology": 0.5,
-                    "healthcare": 0.5
-                },
-                "interaction_history": []
-            }
-            
-            # Save default profile
-            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
-            with open(profile_path, 'w') as f:
-                json.dump(default_profile, f, indent=2)
-            
-            return default_profile
+        return self.profile_store.get(user_id)
     
     def update_user_profile(self, user_id: str, query: str, response: str) -> None:
         """Update user profile with new interaction and inferred preferences"""
-        profile = self.get_user_profile(user_id)
-        
-        # Add interaction to history
-        profile["interaction_history"].append({
+        return self.apply_profile_updates(user_id, [{
             "query": query,
-            "timestamp": datetime.now().isoformat(),
-            "response_summary": response[:100] + "..." if len(response) > 100 else response
-        })
-        
-        # Limit history size
-        profile["interaction_history"] = profile["interaction_history"][-20:]
+            "response": response,
+            "timestamp": datetime.now().isoformat()
+        }])
+    
+    def apply_profile_updates(self, user_id: str, interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fold a batch of interactions into the profile with a single preference inference"""
+        queries = "\n".join(f'- "{interaction["query"]}"' for interaction in interactions)
         
-        # Analyze query to update user preferences
+        # Analyze the queries to update user preferences
         prompt = f"""
-        Analyze this user query to extract financial preferences, interests, and risk tolerance.
-        Query: "{query}"
+        Analyze these user queries to extract financial preferences, interests, and risk tolerance.
+        Queries:
+        {queries}
         
         Provide updates to the user profile in JSON format. If no clear preferences are found, return empty values.
         {{
@@ -510,6 +415,8 @@ class PersonalizedFinancialAdvisor:
         }}
         """
         
+        # The LLM call happens outside the profile lock; only the merge below holds it
+        preference_updates = {}
         try:
             llm_response = self.llm(prompt)
             # Extract JSON response
@@ -518,124 +425,150 @@ class PersonalizedFinancialAdvisor:
             if json_start >= 0 and json_end > json_start:
                 json_str = llm_response[json_start:json_end]
                 preference_updates = json.loads(json_str)
-                
-                # Update profile with non-empty values
-                if preference_updates.get("risk_tolerance"):
-                    profile["risk_tolerance"] = preference_updates["risk_tolerance"]
-                
-                if preference_updates.get("financial_goals"):
-                    new_goals = [g for g in preference_updates["financial_goals"] if g]
-                    if new_goals:
-                        profile["financial_goals"] = list(set(profile["financial_goals"] + new_goals))
-                
-                # Update preferences with non-default values
-                if "preferences" in preference_updates:
-                    for k, v in preference_updates["preferences"].items():
-                        if k in profile["preferences"] and v != -1.0:
-                            # Blend the new preference with existing (70% existing, 30% new)
-                            profile["preferences"][k] = 0.7 * profile["preferences"][k] + 0.3 * v
-                
-                # Save updated profile
-                profile_path = f"data/user_profiles/{user_id}.json"
-                with open(profile_path, 'w') as f:
-                    json.dump(profile, f, indent=2)
         except Exception as e:
             print(f"Error updating user profile: {str(e)}")
         
-        return profile
+        def merge(profile: Dict[str, Any]) -> None:
+            # Add interactions to history
+            for interaction in interactions:
+                response = interaction["response"]
+                profile["interaction_history"].append({
+                    "query": interaction["query"],
+                    "timestamp": interaction["timestamp"],
+                    "response_summary": response[:100] + "..." if len(response) > 100 else response
+                })
+            
+            # Limit history size
+            profile["interaction_history"] = profile["interaction_history"][-20:]
+            
+            # Update profile with non-empty values
+            if preference_updates.get("risk_tolerance"):
+                profile["risk_tolerance"] = preference_updates["risk_tolerance"]
+            
+            if preference_updates.get("financial_goals"):
+                new_goals = [g for g in preference_updates["financial_goals"] if g]
+                if new_goals:
+                    profile["financial_goals"] = list(set(profile["financial_goals"] + new_goals))
+            
+            # Update preferences with non-default values
+            if isinstance(preference_updates.get("preferences"), dict):
+                for k, v in preference_updates["preferences"].items():
+                    if k in profile["preferences"] and isinstance(v, (int, float)) and v != -1.0:
+                        # Blend the new preference with existing (70% existing, 30% new)
+                        profile["preferences"][k] = 0.7 * profile["preferences"][k] + 0.3 * v
+        
+        return self.profile_store.update(user_id, merge)
     
     def retrieve_context(self, query: str, user_id: str, top_k: int = 50) -> Dict[str, Any]:
-        """Retrieve relevant context using both Pinecone and Neo4j"""
+        """Retrieve relevant context using hybrid (dense + BM25) search and Neo4j.
+
+        The vector, keyword and graph sources run concurrently on the runtime's
+        retrieval pool, each with its own timeout; a source that fails or times
+        out contributes nothing and is listed under "degraded_sources".
+        """
         results = {
             "vector_contexts": [],
-            "graph_facts": []
+            "graph_facts": [],
+            "timings": {},
+            "degraded_sources": []
         }
-        
-        # Step 1: Retrieve from Pinecone vector DB
-        query_embedding = self.embedding_model.get_embeddings([query])[0]
-        vector_results = self.vector_db.query(
-            vector=query_embedding,
-            filter={"user_id": user_id},
-            top_k=top_k,
-            include_metadata=True
+        timings = results["timings"]
+        retrieval_started = time.perf_counter()
+        
+        # Step 1: Fan out to every source at once
+        futures = {
+            "vector": self.runtime.retrieval_pool.submit(self._dense_search, query, user_id, top_k),
+            "bm25": self.runtime.retrieval_pool.submit(self._keyword_search, query, user_id, top_k),
+            "graph": self.runtime.retrieval_pool.submit(self._graph_search, query, user_id, top_k)
+        }
+        source_results = {}
+        for source, future in futures.items():
+            # All sources started together, so each deadline is measured from the fan-out
+            remaining = self._source_timeout(source) - (time.perf_counter() - retrieval_started)
+            try:
+                source_results[source], source_timings = future.result(timeout=max(remaining, 0))
+                timings.update(source_timings)
+            except Exception as e:
+                future.cancel()
+                reason = "timed out" if isinstance(e, FutureTimeoutError) else str(e)
+                print(f"Retrieval source '{source}' unavailable ({reason}); continuing with partial results")
+                results["degraded_sources"].append(source)
+                source_results[source] = []
+        timings["retrieval_ms"] = round((time.perf_counter() - retrieval_started) * 1000, 1)
+        
+        vector_results = source_results["vector"]
+        keyword_results = source_results["bm25"]
+        results["graph_facts"] = source_results["graph"]
+        
+        started = time.perf_counter()
+        fused_results = fuse_results(
+            [vector_results, keyword_results],
+            method=os.getenv("RETRIEVAL_FUSION", "rrf"),
+            weights=[1.0, float(os.getenv("BM25_FUSION_WEIGHT", "1.0"))],
+            rrf_k=int(os.getenv("RRF_K", "60")),
+            top_k=top_k
         )
+        timings["fusion_ms"] = round((time.perf_counter() - started) * 1000, 1)
         
-        # Extract text from results
-        if vector_results and "matches" in vector_results:
-            retrieved_contexts = [{"text": match["metadata"]["text"]} for match in vector_results["matches"]]
-            # Add deduplication to ensure variety in retrieved contexts
-            unique_contexts = []
-            seen = set()
-            for context in retrieved_contexts:
-                content = context['text']
-                if content not in seen:
-                    seen.add(content)
-                    unique_contexts.append(context)
-
-            results["vector_contexts"] = [ctx["text"] for ctx in unique_contexts]
-        
-        # Step 2: Search for relevant entities in Neo4j
-        # Generate search terms from query
-        search_prompt = f"""
-        Extract the key financial entities, concepts, or metrics in this query.
-        Return only a comma-separated list of the key terms, with no explanation.
-        
-        Query: "{query}"
-        
-        Key terms:
-        """
+        # Keep text, fused score and fingerprint so the packer can rank and deduplicate
+        retrieved_chunks = [
+            {"text": match["metadata"]["text"], "score": match["score"], "simhash": match["metadata"].get("simhash")}
+            for match in fused_results
+        ]
         
-        search_terms = self.llm(search_prompt).split(",")
-        search_terms = [term.strip().lower() for term in search_terms if term.strip()]
+        # Optionally rescore the fused candidates and keep only the best few
+        if self.reranker:
+            started = time.perf_counter()
+            retrieved_chunks = self.reranker.rerank(query, retrieved_chunks)
+            timings["rerank_ms"] = round((time.perf_counter() - started) * 1000, 1)
         
-        # Query Neo4j for relevant facts
-        if search_terms:
-            search_pattern = "|".join(search_terms)
-            
-            with self.neo4j_driver.session() as session:
-                cypher_query = """
-                MATCH (e1:Entity)-[r:RELATES]->(e2:Entity)
-                WHERE e1.user_id = $user_id 
-                AND (toLower(e1.text) CONTAINS $search_term OR toLower(e2.text) CONTAINS $search_term)
-                RETURN e1.text AS entity1, r.type AS relationship, e2.text AS entity2, 
-                    r.value AS value, r.context AS context
-                LIMIT $limit
-                """
-                
-                facts = []
-                for term in search_terms:
-                    result = session.run(
-                        cypher_query,
-                        user_id=user_id,
-                        search_term=term.lower(),
-                        limit=top_k
-                    )
-                    
-                    for record in result:
-                        fact = {
-                            "entity1": record["entity1"],
-                            "relationship": record["relationship"],
-                            "entity2": record["entity2"],
-                            "value": record["value"],
-                            "context": record["context"]
-                        }
-                        facts.append(fact)
-                
-                # Deduplicate facts
-                unique_facts = []
-                seen = set()
-                for fact in facts:
-                    key = (fact["entity1"], fact["relationship"], fact["entity2"])
-                    if key not in seen:
-                        seen.add(key)
-                        unique_facts.append(fact)
-                
-                results["graph_facts"] = unique_facts[:top_k]
+        # Step 2: Pack distinct chunks and facts into the prompt token budget
+        started = time.perf_counter()
+        results["vector_contexts"], results["graph_facts"], results["packing"] = self.context_packer.pack(
+            retrieved_chunks, results["graph_facts"]
+        )
+        timings["packing_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Retrieval timings (ms): {timings}")
         
         return results
     
-    def generate_personalized_response(self, query: str, user_id: str, contexts: Dict[str, Any]) -> str:
-        """Generate a personalized response based on retrieved contexts and user profile"""
+    def _source_timeout(self, source: str) -> float:
+        """Per-source timeout in seconds, e.g. GRAPH_RETRIEVAL_TIMEOUT, else RETRIEVAL_TIMEOUT"""
+        default = os.getenv("RETRIEVAL_TIMEOUT", "10")
+        return float(os.getenv(f"{source.upper()}_RETRIEVAL_TIMEOUT", default))
+    
+    def _dense_search(self, query: str, user_id: str, top_k: int) -> tuple:
+        """Embed the query and search the vector store"""
+        started = time.perf_counter()
+        query_embedding = self.embedding_model.get_embeddings([query])[0]
+        embedding_ms = round((time.perf_counter() - started) * 1000, 1)
+        
+        started = time.perf_counter()
+        vector_results = self.vector_db.query(
+            vector=query_embedding,
+            filter={"user_id": user_id},
+            top_k=top_k
+        )
+        return vector_results, {"embedding_ms": embedding_ms, "vector_ms": round((time.perf_counter() - started) * 1000, 1)}
+    
+    def _keyword_search(self, query: str, user_id: str, top_k: int) -> tuple:
+        """BM25 catches exact tickers, line items and figures that embeddings blur"""
+        started = time.perf_counter()
+        keyword_results = self.keyword_index.search(user_id, query, top_k=top_k)
+        return keyword_results, {"bm25_ms": round((time.perf_counter() - started) * 1000, 1)}
+    
+    def _graph_search(self, query: str, user_id: str, top_k: int) -> tuple:
+        """Extract search terms locally, then look up facts with one full-text query"""
+        started = time.perf_counter()
+        search_terms = self.term_extractor.extract(query)
+        search_terms_ms = round((time.perf_counter() - started) * 1000, 1)
+        
+        started = time.perf_counter()
+        graph_facts = self.graph_search.search(user_id, search_terms, limit=top_k)
+        return graph_facts, {"search_terms_ms": search_terms_ms, "graph_ms": round((time.perf_counter() - started) * 1000, 1)}
+    
+    def _build_response_prompt(self, query: str, user_id: str, contexts: Dict[str, Any]) -> str:
+        """Prompt combining the user profile, retrieved chunks and graph facts"""
         # Get user profile
         user_profile = self.get_user_profile(user_id)
         
@@ -644,12 +577,7 @@ class PersonalizedFinancialAdvisor:
         
         graph_facts_text = ""
         if contexts["graph_facts"]:
-            facts = []
-            for fact in contexts["graph_facts"]:
-                fact_str = f"- {fact['entity1']} {fact['relationship']} {fact['entity2']}"
-                if fact["value"]:
-                    fact_str += f" ({fact['value']})"
-                facts.append(fact_str)
+            facts = [format_fact(fact) for fact in contexts["graph_facts"]]
             graph_facts_text = "Relevant financial facts:\n" + "\n".join(facts)
         else:
             graph_facts_text = "No relevant knowledge graph facts found."
@@ -680,26 +608,64 @@ class PersonalizedFinancialAdvisor:
         general advice based on the user's profile.
         """
         
-        # Generate response
-        response = self.llm(prompt)
+        return prompt
+    
+    def generate_personalized_response(self, query: str, user_id: str, contexts: Dict[str, Any]) -> str:
+        """Generate a personalized response based on retrieved contexts and user profile"""
+        prompt = self._build_response_prompt(query, user_id, contexts)
+        
+        # Generate response; near-identical repeat questions from this user may be served from cache
+        response = self.llm(prompt, semantic_key=query, semantic_scope=user_id)
         
         # Update user profile based on this interaction
-        self.update_user_profile(user_id, query, response)
+        self._record_interaction(user_id, query, response)
         
         return response
     
+    def stream_personalized_response(self, query: str, user_id: str, contexts: Dict[str, Any], cancel_event=None):
+        """Yield the personalized response token by token; the profile is updated once it completes.
+
+        StreamInterruptedError from the LLM propagates, and the cut-off answer is not recorded.
+        """
+        prompt = self._build_response_prompt(query, user_id, contexts)
+        
+        tokens = self.llm.stream(prompt, cancel_event=cancel_event, semantic_key=query, semantic_scope=user_id)
+        parts = []
+        completed = False
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+            completed = True
+        finally:
+            # Also runs when the client disconnects and the generator is closed
+            tokens.close()
+        
+        if completed and not (cancel_event is not None and cancel_event.is_set()):
+            self._record_interaction(user_id, query, "".join(parts))
+    
+    def _record_interaction(self, user_id: str, query: str, response: str) -> None:
+        """Inference runs in the background, coalesced per user, so answers are not held up by it"""
+        if os.getenv("PROFILE_UPDATES_ASYNC", "1") == "1":
+            self.runtime.profile_updates.submit(
+                user_id,
+                {"query": query, "response": response, "timestamp": datetime.now().isoformat()},
+                self.apply_profile_updates
+            )
+        else:
+            self.update_user_profile(user_id, query, response)
+    
 
 
 # LangGraph Nodes
 
 # Fix 2: Correct process_document_node function
-def process_document_node(state: FinancialAdvisorState) -> FinancialAdvisorState:
+def process_document_node(state: FinancialAdvisorState, advisor: PersonalizedFinancialAdvisor) -> FinancialAdvisorState:
     """Process a document and update the state"""
     if not state["document_path"]:
         raise ValueError("Document path is required")
     
     try:
-        advisor = PersonalizedFinancialAdvisor()
         # Direct call to class method instead of using workflow
         result = advisor.process_financial_document(state["document_path"], state["user_id"])
         
@@ -713,13 +679,13 @@ def process_document_node(state: FinancialAdvisorState) -> FinancialAdvisorState
         state["error"] = str(e)
         return state
 
-def retrieve_context_node(state: FinancialAdvisorState) -> FinancialAdvisorState:
+def retrieve_context_node(state: FinancialAdvisorState, advisor: PersonalizedFinancialAdvisor) -> FinancialAdvisorState:
     """Retrieve relevant context for the query"""
-    advisor = PersonalizedFinancialAdvisor()
     contexts = advisor.retrieve_context(state["query"], state["user_id"])
     
     state["relevant_contexts"] = contexts["vector_contexts"]
     state["relevant_facts"] = contexts["graph_facts"]
+    state["retrieval_timings"] = contexts["timings"]
     
     # Get user profile
     state["user_profile"] = advisor.get_user_profile(state["user_id"])
@@ -727,10 +693,8 @@ def retrieve_context_node(state: FinancialAdvisorState) -> FinancialAdvisorState
     return state
 
 # Fix 3: Correct evaluate_response call
-def generate_response_node(state: FinancialAdvisorState) -> FinancialAdvisorState:
+def generate_response_node(state: FinancialAdvisorState, advisor: PersonalizedFinancialAdvisor) -> FinancialAdvisorState:
     """Generate a personalized response"""
-    advisor = PersonalizedFinancialAdvisor()
-    
     contexts = {
         "vector_contexts": state["relevant_contexts"] or [],
         "graph_facts": state["relevant_facts"] or []
@@ -759,14 +723,18 @@ def generate_response_node(state: FinancialAdvisorState) -> FinancialAdvisorStat
     return state
 
 # Define the LangGraph workflow
-def build_workflow():
-    """Build the LangGraph workflow for the financial advisor"""
+def build_workflow(advisor: PersonalizedFinancialAdvisor):
+    """Build the LangGraph workflow for the financial advisor.
+
+    The advisor (and through it the shared runtime clients) is injected into
+    every node instead of each node constructing its own.
+    """
     workflow = StateGraph(FinancialAdvisorState)
     
     # Add nodes
-    workflow.add_node("process_document", process_document_node)
-    workflow.add_node("retrieve_context", retrieve_context_node)
-    workflow.add_node("generate_response", generate_response_node)
+    workflow.add_node("process_document", partial(process_document_node, advisor=advisor))
+    workflow.add_node("retrieve_context", partial(retrieve_context_node, advisor=advisor))
+    workflow.add_node("generate_response", partial(generate_response_node, advisor=advisor))
     
     # Add a start node
     workflow.add_node("start", lambda x: x)  # Identity function as placeholder
@@ -793,20 +761,21 @@ def build_workflow():
 
     return workflow.compile()
 
+# Compiled once on first use and shared across requests and threads
+workflow_registry.register("financial_advisor", lambda: build_workflow(PersonalizedFinancialAdvisor()))
+
 # Main functions to expose the functionality
 
 # Fix 5: Remove duplicate standalone process_financial_document function
 # and replace with simpler wrapper function:
 
-def process_financial_document(document_path: str, user_id: str) -> Dict:
+def process_financial_document(document_path: str, user_id: str, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict:
     """Process a financial document and build knowledge graph - wrapper function"""
     advisor = PersonalizedFinancialAdvisor()
-    return advisor.process_financial_document(document_path, user_id)  
+    return advisor.process_financial_document(document_path, user_id, progress=progress)
 
 def get_financial_advice(query: str, user_id: str, document_path: str = None) -> str:
     """Get financial advice based on user query and context"""
-    advisor = PersonalizedFinancialAdvisor()
-    
     # Initialize state
     state = {
         "user_id": user_id,
@@ -815,11 +784,20 @@ def get_financial_advice(query: str, user_id: str, document_path: str = None) ->
     }
     
     # Run workflow
-    workflow = build_workflow()
+    workflow = workflow_registry.get("financial_advisor")
     result = workflow.invoke(state)
     
     return result["response"]
 
+def stream_financial_advice(query: str, user_id: str, document_path: str = None, cancel_event=None):
+    """Streaming counterpart of get_financial_advice: yields response tokens as they are generated"""
+    advisor = PersonalizedFinancialAdvisor()
+    if document_path:
+        advisor.process_financial_document(document_path, user_id)
+    
+    contexts = advisor.retrieve_context(query, user_id)
+    yield from advisor.stream_personalized_response(query, user_id, contexts, cancel_event=cancel_event)
+
 # Fix 6: Add data validation to update_user_preferences
 def update_user_preferences(user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
     """Update user preferences manually"""
@@ -829,25 +807,21 @@ def update_user_preferences(user_id: str, preferences: Dict[str, Any]) -> Dict[s
         raise ValueError("Preferences must be a non-empty dictionary")
         
     advisor = PersonalizedFinancialAdvisor()
-    profile = advisor.get_user_profile(user_id)
-    
-    # Update profile with provided preferences with validation
-    for key, value in preferences.items():
-        if key in profile:
-            profile[key] = value
-        elif key == "preferences" and isinstance(value, dict):
-            for pref_key, pref_val in value.items():
-                if pref_key in profile["preferences"]:
-                    # Ensure value is a number between 0 and 1 for preferences
-                    if isinstance(pref_val, (int, float)) and 0 <= pref_val <= 1:
-                        profile["preferences"][pref_key] = pref_val
-    
-    # Save updated profile
-    profile_path = f"data/user_profiles/{user_id}.json"
-    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
-    with open(profile_path, 'w') as f:
-        json.dump(profile, f, indent=2)
-    return profile
+    
+    def apply_preferences(profile: Dict[str, Any]) -> None:
+        # Update profile with provided preferences with validation
+        for key, value in preferences.items():
+            if key in profile:
+                profile[key] = value
+            elif key == "preferences" and isinstance(value, dict):
+                for pref_key, pref_val in value.items():
+                    if pref_key in profile["preferences"]:
+                        # Ensure value is a number between 0 and 1 for preferences
+                        if isinstance(pref_val, (int, float)) and 0 <= pref_val <= 1:
+                            profile["preferences"][pref_key] = pref_val
+    
+    # Read-modify-write under the user's lock, saved atomically
+    return advisor.profile_store.update(user_id, apply_preferences)
 
 # def get_model_evaluation(query: str, response: str, contexts: List[str]) -> Dict[str, Any]:
 #     """Evaluate the model's response based on the provided contexts"""
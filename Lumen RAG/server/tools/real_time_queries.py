@@ -13,6 +13,9 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import aiohttp
 import time
+from models.async_llm import AsyncOpenRouterLLM
+from models.http_pool import close_async_http_client
+from models.circuit_breaker import circuit_metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,6 +48,9 @@ class RealTimeQueries:
         self._stock_cache = {}
         self._news_cache = {}
         self._cache_timeout = 60  # Cache timeout in seconds
+        # Answers free-form questions that match no FAQ, without blocking the event loop
+        llm_api_key = os.getenv("OPENROUTER_GEMMA_API_KEY")
+        self.llm = AsyncOpenRouterLLM(api_key=llm_api_key) if llm_api_key else None
 
     async def initialize(self):
         """Initialize aiohttp session"""
@@ -56,6 +62,7 @@ class RealTimeQueries:
         if self.session:
             await self.session.close()
             self.session = None
+        await close_async_http_client()
         self.executor.shutdown()
 
     @lru_cache(maxsize=100)
@@ -155,6 +162,26 @@ class RealTimeQueries:
             "suggestion": "Try rephrasing your question or check our documentation for more information."
         }
 
+    async def answer_question(self, question: str) -> Dict:
+        """
+        Answer from the FAQ when possible, otherwise ask the LLM.
+        """
+        faq = self.get_faq_answer(question)
+        if "error" not in faq or not self.llm:
+            return faq
+
+        prompt = f"""You are a helpful financial assistant. Answer the following question concisely and factually.
+If it depends on the user's personal situation, say so and explain the main considerations.
+
+Question: {question}
+"""
+        try:
+            answer = await self.llm(prompt)
+            return {"question": question, "answer": answer, "category": "llm"}
+        except Exception as e:
+            logger.error(f"Error answering question: {str(e)}")
+            return faq
+
     async def process_query(self, query: str) -> Dict:
         """
         Process a real-time query and return appropriate response.
@@ -177,7 +204,7 @@ class RealTimeQueries:
         
         # Check if it's a FAQ query
         else:
-            return self.get_faq_answer(query)
+            return await self.answer_question(query)
 
 # FastAPI application setup
 app = FastAPI()
@@ -236,6 +263,14 @@ async def get_news(query: str = "finance", limit: int = 5):
 async def get_faq(question: str):
     return rtq.get_faq_answer(question)
 
+@app.get("/ask")
+async def ask(question: str):
+    return await rtq.answer_question(question)
+
+@app.get("/llm-metrics")
+async def llm_metrics():
+    return {"circuits": circuit_metrics()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,48 @@
+import threading
+from typing import Any, Callable, Dict
+
+
+class WorkflowRegistry:
+    """Compiles each registered LangGraph workflow once and shares it across requests and threads.
+
+    Compiled graphs hold no per-request state (there is no checkpointer), so a
+    single instance can be invoked concurrently.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._compiled: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, builder: Callable[[], Any]) -> None:
+        """Register a zero-argument builder that returns a compiled workflow"""
+        with self._lock:
+            self._builders[name] = builder
+            self._compiled.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the compiled workflow, compiling it on first use"""
+        compiled = self._compiled.get(name)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            compiled = self._compiled.get(name)
+            if compiled is None:
+                if name not in self._builders:
+                    raise KeyError(f"No workflow registered under '{name}'")
+                compiled = self._builders[name]()
+                self._compiled[name] = compiled
+        return compiled
+
+    def reset(self, name: str = None) -> None:
+        """Drop compiled graphs so they are rebuilt on next use"""
+        with self._lock:
+            if name is None:
+                self._compiled.clear()
+            else:
+                self._compiled.pop(name, None)
+
+
+# Process-wide registry used by the tools
+workflow_registry = WorkflowRegistry()
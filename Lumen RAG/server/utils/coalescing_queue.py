@@ -0,0 +1,95 @@
+import os
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class CoalescingQueue:
+    """Background work queue that batches items per key.
+
+    Items submitted for the same key while an earlier batch is still waiting
+    (or running) are folded into a single handler call, so a burst of queries
+    from one user costs one profile inference instead of one each. At most one
+    batch per key runs at a time, which also serialises writes per key.
+    """
+
+    def __init__(self, max_workers: int = None, coalesce_seconds: float = None, name: str = "coalescing-queue"):
+        self.max_workers = max_workers or int(os.getenv("PROFILE_UPDATE_WORKERS", "2"))
+        self.coalesce_seconds = coalesce_seconds if coalesce_seconds is not None else float(
+            os.getenv("PROFILE_UPDATE_COALESCE_SECONDS", "2.0")
+        )
+        self.name = name
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending: Dict[str, List[Any]] = {}
+        self._handlers: Dict[str, Callable[[str, List[Any]], None]] = {}
+        self._first_submitted: Dict[str, float] = {}
+        self._scheduled = set()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._stats = {"submitted": 0, "batches": 0, "errors": 0}
+
+    def submit(self, key: str, item: Any, handler: Callable[[str, List[Any]], None]) -> None:
+        """Queue an item; handler(key, items) later receives every item pending for the key"""
+        with self._lock:
+            self._start_workers()
+            self._pending.setdefault(key, []).append(item)
+            self._handlers[key] = handler
+            self._first_submitted.setdefault(key, time.monotonic())
+            self._stats["submitted"] += 1
+            if key not in self._scheduled and key not in self._running:
+                self._scheduled.add(key)
+                self._queue.put(key)
+
+    def join(self) -> None:
+        """Block until every queued batch has been handled"""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, pending_keys=len(self._pending))
+
+    def _start_workers(self) -> None:
+        if self._workers:
+            return
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self) -> None:
+        while True:
+            key = self._queue.get()
+            try:
+                # Give the burst a moment to accumulate before handling it
+                with self._lock:
+                    wait = self._first_submitted.get(key, 0) + self.coalesce_seconds - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                with self._lock:
+                    items = self._pending.pop(key, [])
+                    handler = self._handlers.pop(key, None)
+                    self._first_submitted.pop(key, None)
+                    self._scheduled.discard(key)
+                    self._running.add(key)
+
+                try:
+                    if items and handler:
+                        handler(key, items)
+                        with self._lock:
+                            self._stats["batches"] += 1
+                except Exception as e:
+                    print(f"Error in {self.name} handling '{key}': {str(e)}")
+                    with self._lock:
+                        self._stats["errors"] += 1
+                finally:
+                    with self._lock:
+                        self._running.discard(key)
+                        # Items that arrived mid-run become the next batch
+                        if key in self._pending:
+                            self._scheduled.add(key)
+                            self._queue.put(key)
+            finally:
+                self._queue.task_done()
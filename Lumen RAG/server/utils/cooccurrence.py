@@ -0,0 +1,53 @@
+import os
+from typing import Dict, List, Tuple
+
+
+class CooccurrenceBuilder:
+    """Builds weighted co-occurrence edges between entity mentions.
+
+    Two mentions co-occur only when they are at most `window` tokens apart, and
+    every repeat of the same entity pair is folded into a single edge whose
+    weight counts the co-occurrences. Edges keep a short list of chunk indices
+    rather than a copy of the chunk text.
+    """
+
+    def __init__(self, window: int = None, max_chunk_refs: int = 5):
+        self.window = window if window is not None else int(os.getenv("COOCCURRENCE_WINDOW", "20"))
+        self.max_chunk_refs = max_chunk_refs
+        self._edges: Dict[Tuple[str, str], Dict] = {}
+
+    def add_chunk(self, chunk_index: int, mentions: List[Tuple[str, int, int]]) -> None:
+        """Add the entity mentions of one chunk as (entity_id, token_start, token_end) tuples"""
+        ordered = sorted(mentions, key=lambda m: m[1])
+
+        for i, (id_a, _, end_a) in enumerate(ordered):
+            for id_b, start_b, _ in ordered[i + 1:]:
+                # Mentions are sorted by start, so every later one is further away
+                if start_b - end_a > self.window:
+                    break
+                if id_a == id_b:
+                    continue
+
+                key = (id_a, id_b) if id_a < id_b else (id_b, id_a)
+                edge = self._edges.get(key)
+                if edge is None:
+                    edge = {"source": key[0], "target": key[1], "weight": 0, "chunk_refs": []}
+                    self._edges[key] = edge
+
+                edge["weight"] += 1
+                if chunk_index not in edge["chunk_refs"] and len(edge["chunk_refs"]) < self.max_chunk_refs:
+                    edge["chunk_refs"].append(chunk_index)
+
+    def relationships(self) -> List[Dict]:
+        """Return one relationship per entity pair in the shape the graph writer expects"""
+        return [
+            {
+                "source": edge["source"],
+                "target": edge["target"],
+                "type": "co-occurrence",
+                "weight": edge["weight"],
+                "chunk_refs": list(edge["chunk_refs"]),
+                "context": "chunks " + ",".join(str(c) for c in edge["chunk_refs"])
+            }
+            for edge in self._edges.values()
+        ]
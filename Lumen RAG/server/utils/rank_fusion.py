@@ -0,0 +1,42 @@
+from typing import List, Dict, Any
+
+
+def fuse_results(
+    result_lists: List[List[Dict[str, Any]]],
+    method: str = "rrf",
+    weights: List[float] = None,
+    rrf_k: int = 60,
+    top_k: int = None
+) -> List[Dict[str, Any]]:
+    """Merge ranked {"id", "score", "metadata"} lists into one ranking.
+
+    "rrf" sums weight / (rrf_k + rank) per list (reciprocal rank fusion);
+    "weighted" min-max normalises each list's scores and sums them by weight.
+    """
+    weights = weights or [1.0] * len(result_lists)
+    fused: Dict[str, Dict[str, Any]] = {}
+
+    for results, weight in zip(result_lists, weights):
+        if not results:
+            continue
+        if method == "weighted":
+            scores = [result["score"] for result in results]
+            low, high = min(scores), max(scores)
+            span = (high - low) or 1.0
+
+        for rank, result in enumerate(results, start=1):
+            if method == "rrf":
+                contribution = weight / (rrf_k + rank)
+            elif method == "weighted":
+                contribution = weight * (result["score"] - low) / span
+            else:
+                raise ValueError(f"Unknown fusion method: {method}")
+
+            entry = fused.get(result["id"])
+            if entry is None:
+                entry = {"id": result["id"], "score": 0.0, "metadata": result["metadata"]}
+                fused[result["id"]] = entry
+            entry["score"] += contribution
+
+    ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+    return ranked[:top_k] if top_k else ranked
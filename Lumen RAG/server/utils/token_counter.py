@@ -1,13 +1,17 @@
 import tiktoken
+from functools import lru_cache
 
-def count_tokens(text, model="gpt-3.5-turbo"):
-    """Count the number of tokens in a string"""
+@lru_cache(maxsize=None)
+def get_encoding(model="gpt-3.5-turbo"):
+    """Load the tokenizer for a model once; building it is far slower than encoding"""
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")  # Default for newer models
-        
-    return len(encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")  # Default for newer models
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """Count the number of tokens in a string"""
+    return len(get_encoding(model).encode(text))
 
 def estimate_tokens_from_context(contexts, query, response):
     """Estimate tokens used in a complete RAG transaction"""